@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+"""
+Synthetic, deterministic corpus for the localization and prefab benchmarks.
+
+Layout (mirrors the repository):
+  <out>/src/<Module>/**/*.cs                    C# files with L.S / L.T calls
+  <out>/loc/<Module>/strings.json               keys x locales
+  <out>/loc/<Module>/Languages/<LOCALE>/        one folder per locale
+  <out>/tpl/<Module>/Bench_*.j2                 top-level templates
+  <out>/tpl/<Module>/_/bench_*/level_*.j2       nested includes using tpl/_macros
+
+Usage:
+  python bench/corpus.py OUT_DIR [--cs-files 2000] [--calls 4] [--keys 3000] [--locales 12] [--templates 20]
+"""
+
+import json
+import random
+import argparse
+
+from pathlib import Path
+from dataclasses import dataclass, asdict
+
+MODULE = "Bench"
+
+WORDS = (
+    "troop retinue culture equipment banner clan faction skill tier upgrade recruit noble "
+    "horse armor weapon shield bow arrow helmet boots gloves cape party garrison kingdom"
+).split()
+
+
+@dataclass
+class CorpusSpec:
+    cs_files: int = 2000  # number of .cs files
+    calls: int = 4  # average L.S/L.T calls per file containing calls
+    empty_ratio: float = 0.4  # share of .cs files without any call (pre-filter path)
+    keys: int = 3000  # distinct keys used in code and in strings.json
+    locales: int = 12  # number of locales
+    coverage: float = 0.7  # share of keys translated per locale
+    templates: int = 20  # top-level templates
+    depth: int = 3  # include nesting below each top-level template
+    widgets: int = 6  # macro calls per template level
+    seed: int = 1
+
+
+def sentence(rng: random.Random, n: int = 5) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def key_name(i: int) -> str:
+    return f"bench_key_{i:05d}"
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                         C# files                       #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def cs_call(rng: random.Random, key: str, text: str) -> str:
+    """One localization call in a random but realistic form."""
+    fn = rng.choice(("S", "S", "S", "T"))
+    form = rng.random()
+    if form < 0.7:
+        text = text.replace('"', '\\"')
+        return f'L.{fn}("{key}", "{text}")'
+    if form < 0.8:
+        return f"L.{fn}('{key}', '{text}')"
+    text = text.replace('"', '""')
+    return f'L.{fn}(@"{key}", @"{text}")'
+
+
+def cs_file(rng: random.Random, index: int, spec: CorpusSpec, fallbacks: list[str]) -> str:
+    lines = [
+        "using System;",
+        "using TaleWorlds.Library;",
+        "",
+        f"namespace Retinues.Bench.Group{index // 50:03d}",
+        "{",
+        f"    public sealed class Generated{index:05d}",
+        "    {",
+    ]
+    calls = 0 if rng.random() < spec.empty_ratio else max(1, round(rng.gauss(spec.calls, spec.calls / 3)))
+    for i in range(calls):
+        k = rng.randrange(spec.keys)
+        # A few call sites disagree on the fallback, to exercise conflict reporting
+        text = fallbacks[k] if rng.random() > 0.01 else sentence(rng)
+        lines.append(f"        public static string Text{i}() => {cs_call(rng, key_name(k), text)};")
+        lines.append(f"        private int _value{i} = {rng.randrange(1000)}; // filler: {sentence(rng, 8)}")
+    for i in range(rng.randrange(5, 30)):
+        lines.append(f"        private readonly string _field{i} = \"{sentence(rng, 4)}\";")
+    lines += ["    }", "}", ""]
+    return "\n".join(lines)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                      strings.json                      #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def locale_codes(spec: CorpusSpec) -> list[str]:
+    return [f"L{i:02d}" for i in range(spec.locales)]
+
+
+def strings_json(rng: random.Random, spec: CorpusSpec, fallbacks: list[str]) -> str:
+    entries = []
+    for k in range(spec.keys):
+        entry = {"id": f"ret_{key_name(k)}", "EN": fallbacks[k]}
+        for code in locale_codes(spec):
+            entry[code] = f"[{code}] {fallbacks[k]}" if rng.random() < spec.coverage else None
+        entries.append(entry)
+    entries.sort(key=lambda e: e["id"].lower())
+    return json.dumps(entries, ensure_ascii=False, indent=2) + "\n"
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                        templates                       #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def template_level(t: int, level: int, spec: CorpusSpec) -> str:
+    """One include level: a loop of global macro calls, then the next level."""
+    nested = f'{{% include "_/bench_{t:03d}/level_{level + 1}.j2" %}}\n' if level + 1 < spec.depth else ""
+    return f"""<ListPanel WidthSizePolicy="StretchToParent" HeightSizePolicy="CoverChildren" StackLayout.LayoutMethod="{{{{ vttb }}}}">
+    <Children>
+        {{% for i in range({spec.widgets}) %}}
+        {{{{ text.base(text="@Level{level}Text" ~ i, margin_left="4") }}}}
+        {{{{ button.text(text="@Level{level}Button" ~ i, command="ExecuteLevel{level}", brush="Popup.Button.Text") }}}}
+        {{{{ tooltip.icon(hint="Level{level}Hint") }}}}
+        {{{{ divider.line() }}}}
+        {{% endfor %}}
+        {nested}    </Children>
+</ListPanel>
+"""
+
+
+def top_template(t: int, spec: CorpusSpec) -> str:
+    include = f'{{% include "_/bench_{t:03d}/level_0.j2" %}}\n' if spec.depth else ""
+    return f"""<Prefab>
+    <Window>
+        <Widget Id="Bench{t:03d}" WidthSizePolicy="StretchToParent" HeightSizePolicy="StretchToParent">
+            <Children>
+                <!-- Generated benchmark prefab {t} -->
+                {include}            </Children>
+        </Widget>
+    </Window>
+</Prefab>
+"""
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                        generator                       #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def generate(out: Path, spec: CorpusSpec) -> dict:
+    """Write the corpus under out; return its paths and spec."""
+    rng = random.Random(spec.seed)
+    fallbacks = [sentence(rng, rng.randrange(2, 9)) + rng.choice(("", "", ".", '! "Quoted"')) for _ in range(spec.keys)]
+
+    src = out / "src" / MODULE
+    for i in range(spec.cs_files):
+        path = src / f"Group{i // 50:03d}" / f"Generated{i:05d}.cs"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(cs_file(rng, i, spec, fallbacks), encoding="utf-8")
+
+    loc = out / "loc" / MODULE
+    for code in locale_codes(spec):
+        (loc / "Languages" / code).mkdir(parents=True, exist_ok=True)
+    (loc / "strings.json").write_text(strings_json(rng, spec, fallbacks), encoding="utf-8")
+
+    tpl = out / "tpl" / MODULE
+    for t in range(spec.templates):
+        (tpl / "_" / f"bench_{t:03d}").mkdir(parents=True, exist_ok=True)
+        (tpl / f"Bench_{t:03d}.j2").write_text(top_template(t, spec), encoding="utf-8")
+        for level in range(spec.depth):
+            (tpl / "_" / f"bench_{t:03d}" / f"level_{level}.j2").write_text(
+                template_level(t, level, spec), encoding="utf-8"
+            )
+
+    return {"src": src, "loc": loc, "tpl": tpl, "spec": asdict(spec)}
+
+
+def add_spec_arguments(ap: argparse.ArgumentParser):
+    for name, default in asdict(CorpusSpec()).items():
+        ap.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default, help=f"(default: {default})")
+
+
+def spec_from_args(args) -> CorpusSpec:
+    return CorpusSpec(**{name: getattr(args, name) for name in asdict(CorpusSpec())})
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Generate a synthetic localization + prefab corpus")
+    ap.add_argument("out", type=Path, help="output directory")
+    add_spec_arguments(ap)
+    args = ap.parse_args()
+
+    corpus = generate(args.out, spec_from_args(args))
+    print(f"[OK] Generated corpus under {args.out}: {corpus['spec']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
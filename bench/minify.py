@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Check and measure the release form of the prefabs (render_prefabs.py --minify).
+
+Checks that minify_xml() keeps the rendered document (same xml_tree():
+elements, attributes in order, non-blank text, CDATA, processing instructions),
+on edge cases and on every template of every module, rendered for each target,
+and that minifying is idempotent. Then prints pretty vs minified sizes per
+output and in total.
+
+Usage:
+  python bench/minify.py [--versions 13,14:_BL14]
+"""
+
+import sys
+import argparse
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tpl"))
+
+import render_prefabs  # noqa: E402
+
+CASES = [
+    ("comments", "<!-- head --><Prefab><!-- a --><Window><A/><!-- b --></Window></Prefab>"),
+    ("blank text", "<Prefab>\n  <Window>\n    <A />\n\n  </Window>\n  \t\n</Prefab>"),
+    ("sole text", "<Prefab><Text>  Hello  </Text><Empty>   </Empty></Prefab>"),
+    ("mixed text", "<Prefab>before<A/>\n  middle &amp; more\n<B>x</B>after</Prefab>"),
+    ("cdata", "<Prefab><Script><![CDATA[ if (a < b) {} ]]></Script><S2><![CDATA[a]]><![CDATA[b]]></S2></Prefab>"),
+    ("text and cdata", "<Prefab><T>x<![CDATA[y]]>z</T><U>\n  a <![CDATA[ b ]]>\n  c\n</U></Prefab>"),
+    ("attributes", '<Prefab><A z="1" a="2" q="&quot;&lt;&amp;&gt;" nl="a&#10;b&#9;c&#13;" /></Prefab>'),
+    ("instructions", '<Prefab><?pi data here?><A><?x?></A></Prefab>'),
+    ("entities", "<Prefab><T>&#233;&#x20AC; &lt;tag&gt;</T></Prefab>"),
+    ("nested empty", "<Prefab><A><B><C></C></B></A></Prefab>"),
+]
+
+
+def check(raw: str, name: str) -> list[str]:
+    """Problems found minifying raw (empty when fine)."""
+    tree = render_prefabs.xml_tree
+    compact = render_prefabs.minify_xml(raw, name=name)
+    problems = []
+    if tree(compact) != tree(raw):
+        problems.append(f"{name}: minified tree differs from the rendered one")
+    if render_prefabs.minify_xml(compact) != compact:
+        problems.append(f"{name}: minifying is not idempotent")
+    if "<!--" in compact:
+        problems.append(f"{name}: comment left in minified output")
+    return problems
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Check that minified prefabs keep the rendered content; report sizes")
+    ap.add_argument("--versions", default="13,14:_BL14", help="targets, as render_prefabs.py --versions (default: 13,14:_BL14)")
+    args = ap.parse_args()
+    targets = render_prefabs.parse_targets(args.versions)
+
+    problems = []
+    for name, raw in CASES:
+        problems += check(raw, name)
+    print(f"[OK] {len(CASES)} edge cases" if not problems else f"[ERROR] {len(problems)} edge case problems")
+
+    total_pretty = total_compact = 0
+    print(f"{'output':<60} {'pretty':>9} {'minified':>9} {'saved':>6}")
+    for module_dir in render_prefabs.iter_modules():
+        env = render_prefabs.build_env(module_dir)
+        for target in targets:
+            target_env = render_prefabs.build_target_env(env, target.version)
+            for rel in render_prefabs.iter_templates(module_dir):
+                name = f"{module_dir.name}/{rel.with_suffix('').as_posix()}{target.suffix}.xml"
+                raw = render_prefabs.render_template(target_env, rel)
+                problems += check(raw, name)
+                pretty = len(render_prefabs.pretty_xml(raw).encode("utf-8"))
+                compact = len(render_prefabs.minify_xml(raw).encode("utf-8"))
+                total_pretty += pretty
+                total_compact += compact
+                print(f"{name:<60} {pretty:>9,} {compact:>9,} {1 - compact / pretty:>6.0%}")
+    if total_pretty:
+        print(f"{'total':<60} {total_pretty:>9,} {total_compact:>9,} {1 - total_compact / total_pretty:>6.0%}")
+
+    for problem in problems:
+        print(f"[ERROR] {problem}", file=sys.stderr)
+    if problems:
+        return 1
+    print("[OK] Minified outputs match their rendered form")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
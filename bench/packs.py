@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+Check that string packs (loc/strpack.py) round-trip the translation store.
+
+Builds a store from a fixture strings.json (newlines, tabs, XML meta-characters,
+non-ASCII ids and texts, empty and null translations, duplicate ids), then for
+every locale builds a pack from the store, reads it back memory-mapped and
+compares each lookup with the texts in the store's export_json(), and with the
+ret_strings.xml rendered from the same strings, as the game parses it.
+With --store, the same comparison also runs on a real store (e.g.
+loc/Retinues/.strings.db, after a strings.py run).
+
+Usage:
+  python bench/packs.py [--store loc/Retinues/.strings.db]
+"""
+
+import sys
+import json
+import argparse
+import tempfile
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "loc"))
+
+import strings  # noqa: E402
+from string_store import StringStore  # noqa: E402
+from strpack import PACK_SUFFIX, StringPack, build_pack, game_text, read_xml_strings  # noqa: E402
+
+LOCALES = ["FR", "JP", "RU"]
+
+FIXTURE = [
+    {"id": "ret_plain", "EN": "Plain text.", "FR": "Texte simple.", "JP": "普通の文章。", "RU": "Простой текст."},
+    {"id": "ret_newlines", "EN": "one\\ntwo", "FR": "un\ndeux\r\ntrois\rquatre", "JP": "一\\n二", "RU": None},
+    {"id": "ret_tabs", "EN": "a\tb", "FR": "a\t\tb", "JP": "\t", "RU": "x\ty"},
+    {"id": "ret_markup", "EN": "<b>&amp;</b>", "FR": "\"guillemets\" & 'apostrophes' <x/>", "JP": "&lt;", "RU": "a > b"},
+    {"id": "ret_tokens", "EN": "{=ret_x}Hello {NAME}", "FR": "{=ret_x}Bonjour {NAME}", "JP": "{NAME}{newline}さん", "RU": ""},
+    {"id": "ret_empty", "EN": "", "FR": "", "JP": None},
+    {"id": "ret_Zeta", "EN": "upper-case id", "FR": "id en majuscules", "JP": "大文字", "RU": "Заглавные"},
+    {"id": "ret_zeta", "EN": "lower-case id", "FR": "id en minuscules", "JP": "小文字", "RU": "строчные"},
+    {"id": "ret_été", "EN": "non-ASCII id", "FR": "id accentué", "JP": "アクセント", "RU": "ударение"},
+    {"id": "ret_emoji", "EN": "🛡 shield", "FR": "🛡 bouclier", "JP": "🛡 盾", "RU": "🛡 щит"},
+    {"id": "ret_long", "EN": "word " * 500, "FR": "mot " * 500, "JP": "言葉" * 500, "RU": "слово " * 500},
+    {"id": "ret_plain", "EN": "Duplicate: last content wins.", "FR": "Doublon.", "JP": "重複。", "RU": "Дубликат."},
+    {"id": "ret_no_en", "FR": "ignored: no EN text"},
+    {"EN": "ignored: no id"},
+]
+
+
+def expected_texts(store: StringStore, code: str) -> dict[str, str]:
+    """{id: text} of every translated entry for code, taken from export_json()."""
+    return {
+        entry["id"]: str(entry[code])
+        for entry in json.loads(store.export_json())
+        if entry.get(code) is not None
+    }
+
+
+def check_locale(store: StringStore, code: str, work_dir: Path) -> list[str]:
+    """Problems found round-tripping one locale of store through a pack (empty when fine)."""
+    strings_ = store.locale_strings(code)
+    xml_path = work_dir / code / "ret_strings.xml"
+    pack_path = xml_path.with_suffix(PACK_SUFFIX)
+    xml_path.parent.mkdir(parents=True, exist_ok=True)
+    xml_path.write_text(strings.render_strings_xml(code, strings_), encoding="utf-8")
+    pack_path.write_bytes(build_pack(strings_))
+
+    expected = {game_text(sid): game_text(text) for sid, text in expected_texts(store, code).items()}
+    from_xml = read_xml_strings(xml_path)
+    problems = []
+    with StringPack.open(pack_path, verify=True) as pack:
+        if len(pack) != len(expected):
+            problems.append(f"{code}: pack has {len(pack)} strings, export_json has {len(expected)}")
+        for sid, text in expected.items():
+            if pack.get(sid) != text:
+                problems.append(f"{code}: '{sid}' is {pack.get(sid)!r} in the pack, {text!r} in export_json")
+            if from_xml.get(sid) != text:
+                problems.append(f"{code}: '{sid}' is {from_xml.get(sid)!r} in the XML, {text!r} in export_json")
+        for sid, _ in pack.items():
+            if sid not in expected:
+                problems.append(f"{code}: '{sid}' is in the pack but not in export_json")
+        if pack.get("ret_not_there") is not None:
+            problems.append(f"{code}: lookup of a missing id returned a text")
+    return problems
+
+
+def check_store(store: StringStore, locale_codes: list[str], work_dir: Path) -> tuple[int, list[str]]:
+    """(strings checked, problems) for every locale of store."""
+    problems, count = [], 0
+    for code in locale_codes:
+        count += len(store.locale_strings(code))
+        problems += check_locale(store, code, work_dir)
+    return count, problems
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Check that string packs round-trip the translation store")
+    ap.add_argument("--store", type=Path, help="also check a real store (a .strings.db written by strings.py)")
+    args = ap.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory(prefix="retinues-packs-") as tmp:
+        tmp = Path(tmp)
+        json_path = tmp / "strings.json"
+        json_path.write_text(json.dumps(FIXTURE, ensure_ascii=False, indent=2), encoding="utf-8")
+        store = StringStore(tmp / ".strings.db")
+        try:
+            store.sync_json(json_path, backup=False)
+            store.ensure_locales(LOCALES)
+            count, found = check_store(store, LOCALES, tmp / "fixture")
+        finally:
+            store.close()
+        print(f"[{'OK' if not found else 'ERROR'}] fixture: {count} strings in {len(LOCALES)} locales")
+        problems += found
+
+        if args.store:
+            if not args.store.exists():
+                print(f"[ERROR] {args.store} not found")
+                return 1
+            store = StringStore(args.store)
+            try:
+                codes = sorted({name for entry in json.loads(store.export_json()) for name in entry} - {"id", "EN"})
+                count, found = check_store(store, codes, tmp / "store")
+            finally:
+                store.close()
+            print(f"[{'OK' if not found else 'ERROR'}] {args.store}: {count} strings in {len(codes)} locales")
+            problems += found
+
+    for problem in problems:
+        print(f"[ERROR] {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
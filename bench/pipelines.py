@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the localization (loc/strings.py) and prefab (tpl/render_prefabs.py)
+pipelines phase by phase on a synthetic corpus (see bench/corpus.py), offline.
+
+Phases:
+  strings.scan        scan every .cs file (no scan cache)
+  strings.scan_cached scan again through a warm scan cache
+  strings.merge       merge per-file hits into entries
+  strings.json        import strings.json into a fresh store, upsert defaults, write strings.json
+  strings.locales     render and write every locale XML and string pack
+  prefabs.env         build the environment and per-version environments (cold bytecode cache)
+  prefabs.render      render every template for every version
+  prefabs.pretty      pretty-print every rendered prefab
+  prefabs.write       write every prefab
+
+Each phase runs --repeat times on fresh state; the median is reported. Results
+are written as JSON; with --baseline, phases slower than the baseline by more
+than --threshold (and by more than --min-delta-ms) fail the run.
+
+Usage:
+  python bench/pipelines.py [-o bench/results.json] [--baseline bench/baseline.json] [--threshold 0.25]
+  python bench/pipelines.py --cs-files 200 --keys 500 --templates 5 --repeat 3   # quick run
+"""
+
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "loc"))
+sys.path.insert(0, str(ROOT / "tpl"))
+
+import corpus  # noqa: E402
+import strings  # noqa: E402
+import render_prefabs  # noqa: E402
+from string_store import StringStore  # noqa: E402
+from strpack import build_pack  # noqa: E402
+
+RESULTS_FORMAT = 1
+TARGETS = render_prefabs.parse_targets("13,14:_BL14")
+
+
+def timed(fn, repeat: int, setup=None) -> dict:
+    """Run setup() then fn(state) repeat times; return timing stats (seconds) and fn's last result."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        state = setup() if setup else None
+        t0 = time.perf_counter()
+        result = fn(state)
+        times.append(time.perf_counter() - t0)
+    return {"median_s": statistics.median(times), "min_s": min(times), "max_s": max(times), "runs": repeat}, result
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                         strings                        #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def bench_strings(paths: dict, work: Path, repeat: int, jobs: int) -> dict:
+    src, loc = paths["src"], paths["loc"]
+    cs_files = sorted(src.rglob("*.cs"))
+    cache_path = work / "scan_cache.json"
+    results = {}
+
+    results["strings.scan"], hits = timed(lambda _: strings.scan_tree(src, cs_files, jobs=jobs)[0], repeat)
+
+    strings.scan_tree(src, cs_files, jobs=jobs, cache_path=cache_path)
+    results["strings.scan_cached"], _ = timed(
+        lambda _: strings.scan_tree(src, cs_files, jobs=jobs, cache_path=cache_path), repeat
+    )
+
+    results["strings.merge"], (entries, _) = timed(lambda _: strings.collect_entries(hits), repeat)
+    ids_sorted = sorted(entries, key=str.lower)
+    ids_to_default = {sid: entries[sid][0] for sid in ids_sorted}
+    locale_codes = strings.list_locale_codes(loc / strings.LOCS_DIRNAME)
+    original_json = (loc / strings.JSON_NAME).read_bytes()
+
+    def fresh_store(_=None):
+        db = work / "strings.db"
+        db.unlink(missing_ok=True)
+        json_path = work / strings.JSON_NAME
+        json_path.write_bytes(original_json)
+        return StringStore(db), json_path
+
+    def sync_json(state):
+        store, json_path = state
+        store.sync_json(json_path)
+        store.upsert_defaults(ids_to_default, locale_codes)
+        store.ensure_locales(locale_codes)
+        strings.OutputWriter().write(json_path, store.export_json())
+        store.commit()
+        store.close()
+
+    results["strings.json"], _ = timed(sync_json, repeat, setup=fresh_store)
+
+    store, json_path = fresh_store()
+    sync_json((store, json_path))
+    out_root = work / "Languages"
+
+    def write_locales(_):
+        shutil.rmtree(out_root, ignore_errors=True)
+        store = StringStore(work / "strings.db")
+        writer = strings.OutputWriter()
+        for code in locale_codes:
+            pairs = store.locale_strings(code)
+            xml_path = out_root / code / "ret_strings.xml"
+            writer.write(xml_path, strings.render_strings_xml(code, pairs))
+            writer.write_bytes(xml_path.with_suffix(".pack"), build_pack(pairs))
+        store.close()
+
+    results["strings.locales"], _ = timed(write_locales, repeat)
+    return results
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                         prefabs                        #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def bench_prefabs(paths: dict, work: Path, repeat: int) -> dict:
+    module_dir = paths["tpl"]
+    templates = list(render_prefabs.iter_templates(module_dir))
+    results = {}
+
+    def cold_cache(_=None):
+        # Point the bytecode cache at an empty directory so every run parses templates
+        cache_dir = work / "jinja"
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        render_prefabs.BYTECODE_CACHE_DIR = cache_dir
+
+    def build(_):
+        env = render_prefabs.build_env(module_dir)
+        return env, {t: render_prefabs.build_target_env(env, t.version) for t in TARGETS}
+
+    original_cache_dir = render_prefabs.BYTECODE_CACHE_DIR
+    try:
+        results["prefabs.env"], (env, target_envs) = timed(build, repeat, setup=cold_cache)
+    finally:
+        render_prefabs.BYTECODE_CACHE_DIR = original_cache_dir
+
+    def render(_):
+        return {
+            (t, rel): render_prefabs.render_template(target_envs[t], rel) for t in TARGETS for rel in templates
+        }
+
+    results["prefabs.render"], raws = timed(render, repeat)
+    results["prefabs.pretty"], pretty = timed(
+        lambda _: {k: render_prefabs.pretty_xml(raw) for k, raw in raws.items()}, repeat
+    )
+
+    out_root = work / "gui"
+
+    def write(_):
+        shutil.rmtree(out_root, ignore_errors=True)
+        for (t, rel), text in pretty.items():
+            render_prefabs.write_atomic(out_root / rel.with_name(rel.stem + t.suffix + ".xml"), text)
+
+    results["prefabs.write"], _ = timed(write, repeat)
+    return results
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                    baseline comparison                 #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list[str]:
+    """Print a comparison table; return the phases that regressed."""
+    if baseline.get("corpus") != results["corpus"]:
+        print("[WARN] Baseline was measured on a different corpus; comparison may be meaningless.", file=sys.stderr)
+
+    regressions = []
+    print(f"{'phase':<22} {'baseline':>10} {'current':>10} {'change':>8}")
+    for phase, stats in results["phases"].items():
+        base = baseline.get("phases", {}).get(phase)
+        if base is None:
+            print(f"{phase:<22} {'-':>10} {stats['median_s'] * 1000:>8.1f}ms {'new':>8}")
+            continue
+        before, now = base["median_s"], stats["median_s"]
+        change = (now - before) / before if before else 0.0
+        regressed = change > threshold and (now - before) * 1000 > min_delta
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{phase:<22} {before * 1000:>8.1f}ms {now * 1000:>8.1f}ms {change:>+7.0%}{flag}")
+        if regressed:
+            regressions.append(phase)
+    return regressions
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the strings and prefab pipelines on a synthetic corpus")
+    ap.add_argument("-o", "--output", type=Path, help="write results JSON here")
+    ap.add_argument("--baseline", type=Path, help="results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (default: 0.25 = +25%%)")
+    ap.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore slowdowns smaller than this (default: 5)")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per phase (default: 5)")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="scan processes, as strings.py --jobs (default: 1)")
+    ap.add_argument("--only", choices=("strings", "prefabs"), help="benchmark a single pipeline")
+    ap.add_argument("--keep", action="store_true", help="keep the generated corpus and print its location")
+    corpus.add_spec_arguments(ap)
+    args = ap.parse_args()
+
+    spec = corpus.spec_from_args(args)
+    work = Path(tempfile.mkdtemp(prefix="retinues-bench-"))
+    try:
+        t0 = time.perf_counter()
+        paths = corpus.generate(work / "corpus", spec)
+        print(f"[INFO] Generated corpus in {time.perf_counter() - t0:.1f}s: {paths['spec']}")
+
+        phases = {}
+        if args.only in (None, "strings"):
+            phases.update(bench_strings(paths, work, args.repeat, args.jobs))
+        if args.only in (None, "prefabs"):
+            phases.update(bench_prefabs(paths, work, args.repeat))
+    finally:
+        if args.keep:
+            print(f"[INFO] Corpus kept in {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    results = {
+        "format": RESULTS_FORMAT,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": paths["spec"],
+        "repeat": args.repeat,
+        "jobs": args.jobs,
+        "phases": phases,
+    }
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"[OK] Wrote {args.output}")
+
+    if not args.baseline:
+        for phase, stats in phases.items():
+            print(f"{phase:<22} {stats['median_s'] * 1000:>8.1f}ms  (min {stats['min_s'] * 1000:.1f}ms)")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"[ERROR] {len(regressions)} phases regressed beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    print(f"[OK] No regression beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmark: streaming pretty_xml() vs the former minidom formatter,
+on the real ClanScreen_* prefabs rendered from tpl/<Module>.
+
+Usage:
+  python bench/pretty_xml.py [--module Retinues] [--version 13] [-n 20]
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+import xml.dom.minidom
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tpl"))
+
+import render_prefabs  # noqa: E402
+
+
+def pretty_xml_minidom(raw: str, indent: str = "  ") -> str:
+    """The minidom-based formatter pretty_xml() replaced (reference implementation)."""
+    parsed = xml.dom.minidom.parseString(raw)
+    pretty = parsed.toprettyxml(indent=indent)
+    lines = [line for line in pretty.splitlines() if line.strip()]
+    return "\n".join(lines)
+
+
+def render_raw(module: str, version: str) -> dict[str, str]:
+    """Render every ClanScreen_* template of module, unformatted: {name: raw xml}."""
+    module_dir = render_prefabs.SCRIPT_DIR / module
+    env = render_prefabs.build_env(module_dir)
+    target_env = render_prefabs.build_target_env(env, version)
+    return {
+        rel.as_posix(): render_prefabs.render_template(target_env, rel)
+        for rel in render_prefabs.iter_templates(module_dir)
+        if rel.name.startswith("ClanScreen_")
+    }
+
+
+def measure(fn, raw: str, repeat: int) -> tuple[float, int]:
+    """Return (best wall time in seconds, peak traced memory in bytes) of fn(raw)."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(raw)
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare pretty_xml() with the minidom formatter")
+    ap.add_argument("--module", default="Retinues", help="template module under tpl/ (default: Retinues)")
+    ap.add_argument("--version", default="13", help="Bannerlord version to render (default: 13)")
+    ap.add_argument("-n", "--repeat", type=int, default=20, help="timing repetitions per file (default: 20)")
+    args = ap.parse_args()
+
+    raws = render_raw(args.module, args.version)
+    if not raws:
+        print(f"[ERROR] No ClanScreen_* templates found in tpl/{args.module}", file=sys.stderr)
+        return 2
+
+    ok = True
+    totals = [0.0, 0.0]
+    print(f"{'file':<55} {'bytes':>8} {'minidom':>10} {'stream':>10} {'speedup':>8} {'mem minidom':>12} {'mem stream':>11}")
+    for name, raw in raws.items():
+        if render_prefabs.pretty_xml(raw) != pretty_xml_minidom(raw):
+            print(f"[ERROR] Output differs from minidom for {name}", file=sys.stderr)
+            ok = False
+
+        t_ref, m_ref = measure(pretty_xml_minidom, raw, args.repeat)
+        t_new, m_new = measure(render_prefabs.pretty_xml, raw, args.repeat)
+        totals[0] += t_ref
+        totals[1] += t_new
+        print(
+            f"{name:<55} {len(raw):>8} {t_ref * 1000:>8.2f}ms {t_new * 1000:>8.2f}ms "
+            f"{t_ref / t_new:>7.1f}x {m_ref / 1024:>10.0f}KB {m_new / 1024:>9.0f}KB"
+        )
+
+    print(f"{'total':<55} {'':>8} {totals[0] * 1000:>8.2f}ms {totals[1] * 1000:>8.2f}ms {totals[0] / totals[1]:>7.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+Startup budget of tpl/render_prefabs.py: how much a short run costs on top of
+starting the interpreter itself.
+
+Runs render_prefabs.py as a subprocess on a copy of tpl/, with its own render
+cache (so the real gui/ and caches are untouched) and reports the median wall time of:
+  python          `python -c pass`, the floor every run pays
+  noop            every output up to date (no template parsed, jinja2 not imported)
+  small           one Constants template changed: it and the templates with
+                  dynamic includes are re-rendered (jinja2 imported, 4 outputs)
+  full            --force, every output re-rendered (for reference)
+  cached          no manifest, every output written from the render cache
+
+noop must stay within --budget-ms of the interpreter startup and small within
+--small-budget-ms; the script exits non-zero when they don't. The defaults
+leave ~30% headroom on a 1-CPU CI-class machine; tighten them locally.
+
+Usage:
+  python bench/startup.py [--repeat 15] [--budget-ms 100] [--small-budget-ms 300]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TARGETS = "13,14:_BL14"
+SMALL_TEMPLATE = Path("Retinues/Constants/ClanScreen_Const_Sort1Width.j2")
+
+
+def median_run(cmd: list[str], repeat: int, before=None) -> float:
+    """Median wall seconds of running cmd repeat times (before(i) runs untimed first)."""
+    times = []
+    for i in range(repeat):
+        if before:
+            before(i)
+        t0 = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def copy_tree(work: Path) -> Path:
+    """Copy the renderer, its macros and module templates under work; return the script path."""
+    tpl = work / "tpl"
+    tpl.mkdir()
+    shutil.copy2(ROOT / "tpl" / "render_prefabs.py", tpl)
+    shutil.copy2(ROOT / "tpl" / "render_cache.py", tpl)
+    for entry in (ROOT / "tpl").iterdir():
+        if entry.is_dir() and not entry.name.startswith((".", "__")):
+            shutil.copytree(entry, tpl / entry.name, ignore=shutil.ignore_patterns("__pycache__"))
+    (work / "tools").mkdir()
+    shutil.copy2(ROOT / "tools" / "timings.py", work / "tools")
+    return tpl / "render_prefabs.py"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Measure render_prefabs.py startup against interpreter startup")
+    ap.add_argument("--repeat", type=int, default=15, help="runs per case (default: 15)")
+    ap.add_argument("--budget-ms", type=float, default=100.0, help="allowed cost of a noop run over `python -c pass` (default: 100)")
+    ap.add_argument("--small-budget-ms", type=float, default=300.0, help="allowed cost of a small re-render over `python -c pass` (default: 300)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="retinues-startup-") as work:
+        work = Path(work)
+        script = copy_tree(work)
+        small = script.parent / SMALL_TEMPLATE
+        if not small.is_file():
+            print(f"[ERROR] Missing {SMALL_TEMPLATE} for the small re-render case", file=sys.stderr)
+            return 2
+        source = small.read_text(encoding="utf-8")
+        render = [sys.executable, str(script), "--versions", TARGETS]
+        os.environ["RETINUES_PREFAB_CACHE"] = str(work / "render-cache")
+
+        # First run renders everything and fills the bytecode cache and manifest
+        subprocess.run(render, check=True, stdout=subprocess.DEVNULL)
+
+        def touch_small(i: int):
+            small.write_text(source + f"{{# {i} #}}\n", encoding="utf-8")
+
+        def drop_manifests(i: int):
+            for manifest in (script.parent / ".cache").glob("*.manifest.json"):
+                manifest.unlink()
+
+        results = {
+            "python": median_run([sys.executable, "-c", "pass"], args.repeat),
+            "noop": median_run(render, args.repeat),
+            "small": median_run(render, args.repeat, before=touch_small),
+            "full": median_run(render + ["--force"], max(3, args.repeat // 3)),
+            "cached": median_run(render, max(3, args.repeat // 3), before=drop_manifests),
+        }
+
+    floor = results["python"]
+    budgets = {"noop": args.budget_ms, "small": args.small_budget_ms}
+    over = []
+    print(f"{'case':<8} {'median':>9} {'over python':>12} {'budget':>8}")
+    for case, seconds in results.items():
+        extra = (seconds - floor) * 1000
+        budget = budgets.get(case)
+        flag = "  OVER BUDGET" if budget is not None and extra > budget else ""
+        shown = f"{budget:>6.0f}ms" if budget is not None else f"{'-':>8}"
+        print(f"{case:<8} {seconds * 1000:>7.1f}ms {extra:>+10.1f}ms {shown}{flag}")
+        if flag:
+            over.append(case)
+
+    if over:
+        print(f"[ERROR] Over the startup budget: {', '.join(over)}", file=sys.stderr)
+        return 1
+    print("[OK] Short runs within their startup budget")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
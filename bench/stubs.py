@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: streaming stub writer (xml/stubs_generator.py) vs the former
+ElementTree writer, which built and indented the whole <NPCCharacters> tree.
+
+Checks that both produce identical bytes (faces, --no-face, escaping, empty
+pools), then measures wall time and peak traced memory for growing pool sizes.
+The streaming writer's peak should stay flat; the tree's grows with the pool.
+Sizes of at least one write batch (write_stubs' batch, 4096 stubs) are compared:
+if the streaming peak at any of them exceeds the peak at the smallest by more
+than --threshold (and by more than --min-delta-kb), the run fails.
+
+Usage:
+  python bench/stubs.py [--sizes 1000,10000,100000,1000000] [--reference-max 100000]
+  python bench/stubs.py --sizes 5000,50000 --reference-max 0 --threshold 0.25   # quick run
+"""
+
+import sys
+import time
+import inspect
+import argparse
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "xml"))
+
+import stubs_generator  # noqa: E402
+
+BATCH = inspect.signature(stubs_generator.write_stubs).parameters["batch"].default
+
+
+def write_stubs_tree(path, npc_ids, culture, default_group, level, face_key_template) -> int:
+    """The ElementTree-based writer stubs_generator.py used before (reference implementation)."""
+    root = ET.Element("NPCCharacters")
+    for npc_id in npc_ids:
+        npc = ET.SubElement(root, "NPCCharacter", {
+            "id": npc_id,
+            "name": npc_id,
+            "is_hidden_encyclopedia": "true",
+            "default_group": default_group,
+            "level": str(level),
+            "is_basic_troop": "true",
+            "occupation": "Soldier",
+            "culture": culture,
+        })
+        if face_key_template:
+            face = ET.SubElement(npc, "face")
+            ET.SubElement(face, "face_key_template", {"value": face_key_template})
+    tree = ET.ElementTree(root)
+    ET.indent(tree, space="  ", level=0)
+    tree.write(path, encoding="utf-8", xml_declaration=True)
+    return len(root)
+
+
+def write_stubs_stream(path, npc_ids, culture, default_group, level, face_key_template) -> int:
+    render = stubs_generator.stub_renderer(culture, default_group, level, face_key_template)
+    return stubs_generator.write_stubs(path, npc_ids, render)
+
+
+def ids(count: int, start: int = 0) -> list[str]:
+    return [f"retinues_custom_{i:04d}" for i in range(start, start + count)]
+
+
+CASES = [
+    ("faces", ids(50), "Culture.empire", "Infantry", 1, "BodyProperty.fighter_empire"),
+    ("no face", ids(50, 9990), "Culture.vlandia", "Ranged", 12, None),
+    ("escaping", ids(3), 'Culture.<"odd" & \tone>', "Caval\nry", 3, "Body\r&Property"),
+    ("non-ascii", ids(3), "Culture.çà", "Infantry", 1, "BodyProperty.é"),
+    ("empty", [], "Culture.empire", "Infantry", 1, "BodyProperty.fighter_empire"),
+    ("one", ids(1), "Culture.empire", "Infantry", 1, None),
+]
+
+
+def check_identical(tmp: Path) -> bool:
+    ok = True
+    for name, npc_ids, *params in CASES:
+        tree_out, stream_out = tmp / "tree.xml", tmp / "stream.xml"
+        write_stubs_tree(tree_out, npc_ids, *params)
+        write_stubs_stream(stream_out, iter(npc_ids), *params)
+        if tree_out.read_bytes() != stream_out.read_bytes():
+            print(f"[ERROR] Output differs from ElementTree for case '{name}'", file=sys.stderr)
+            ok = False
+    if ok:
+        print(f"[OK] Streaming output identical to ElementTree for {len(CASES)} cases")
+    return ok
+
+
+def measure(writer, path: Path, count: int) -> tuple[float, int]:
+    """Return (wall seconds, peak traced bytes) of writing count stubs; ids are generated lazily."""
+    npc_ids = (f"retinues_custom_{i:07d}" for i in range(count))
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    writer(path, npc_ids, "Culture.empire", "Infantry", 1, "BodyProperty.fighter_empire")
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def memory_growth(peaks: dict[int, int], threshold: float, min_delta: int) -> list[str]:
+    """Sizes whose streaming peak grew beyond the allowance over the smallest size of at least one batch."""
+    sizes = sorted(size for size in peaks if size >= BATCH)
+    base = peaks[sizes[0]]
+    grown = []
+    for size in sizes[1:]:
+        change = (peaks[size] - base) / base if base else 0.0
+        if change > threshold and peaks[size] - base > min_delta:
+            grown.append(f"{size} ({change:+.0%} vs {sizes[0]})")
+    return grown
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare the streaming stub writer with the ElementTree writer")
+    ap.add_argument("--sizes", default="1000,10000,100000,1000000", help="comma-separated pool sizes")
+    ap.add_argument("--reference-max", type=int, default=100000, help="largest size also run through ElementTree (default: 100000)")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed streaming peak growth across sizes (default: 0.25 = +25%%)")
+    ap.add_argument("--min-delta-kb", type=float, default=256, help="ignore growth smaller than this (default: 256)")
+    args = ap.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    if len({size for size in sizes if size >= BATCH}) < 2:
+        ap.error(f"--sizes needs at least two sizes of {BATCH} stubs or more to compare memory")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        ok = check_identical(tmp)
+
+        peaks = {}
+        print(f"{'stubs':>9} {'tree':>10} {'stream':>10} {'mem tree':>10} {'mem stream':>11} {'file':>9}")
+        for size in sizes:
+            out = tmp / "stubs.xml"
+            t_new, m_new = measure(write_stubs_stream, out, size)
+            peaks[size] = m_new
+            file_mb = out.stat().st_size / 2**20
+            if size <= args.reference_max:
+                t_ref, m_ref = measure(write_stubs_tree, out, size)
+                ref = f"{t_ref:>9.2f}s {'':>1}", f"{m_ref / 2**20:>8.1f}MB"
+            else:
+                ref = f"{'-':>10} ", f"{'-':>10}"
+            print(f"{size:>9} {ref[0]}{t_new:>9.2f}s {ref[1]} {m_new / 2**20:>9.2f}MB {file_mb:>7.0f}MB")
+
+    grown = memory_growth(peaks, args.threshold, args.min_delta_kb * 1024)
+    if grown:
+        print(f"[ERROR] Streaming peak memory grew beyond {args.threshold:.0%} with the stub count: {', '.join(grown)}", file=sys.stderr)
+        return 1
+    print(f"[OK] Streaming peak memory flat within {args.threshold:.0%} from {min(s for s in peaks if s >= BATCH)} to {max(peaks)} stubs")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
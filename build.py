@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+
+"""
+Build driver: renders prefabs, compiles strings and builds/deploys each module,
+as a graph of stages run concurrently when they don't depend on each other.
+
+Stages, per module:
+  bump:<M>        set the last SubModule version segment (--release only)
+  prefabs:<M>     render tpl/<M> to gui/<M> (render_prefabs, in-process;
+                  minified for --release builds; outputs rendered before,
+                  in any checkout, come from ~/.cache/retinues/prefabs)
+  strings:<M>     sync loc/<M> strings (strings.py, in-process)
+  deploy-gui:<M>  copy gui/<M> to the game (only when the module isn't built:
+                  the full deploy of build:<M> copies the GUI itself)
+  build:<M>       dotnet build (+ deploy), after bump, prefabs and strings
+
+A stage whose inputs and outputs (file stats, options) match its last
+successful run is skipped; --force runs everything. Each stage's output is
+printed as one block when it finishes.
+
+Usage:
+  python build.py [options]     (./build.sh forwards to this script)
+"""
+
+import io
+import os
+import re
+import sys
+import html
+import json
+import time
+import hashlib
+import argparse
+import threading
+import subprocess
+
+from pathlib import Path
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR / "tpl"))
+sys.path.insert(0, str(ROOT_DIR / "loc"))
+sys.path.insert(0, str(ROOT_DIR / "tools"))
+
+import strings  # noqa: E402
+import render_prefabs  # noqa: E402
+from timings import Timings, summarize  # noqa: E402
+
+# Fingerprints of the last successful run of each stage
+STATE_PATH = ROOT_DIR / ".cache" / "build_state.json"
+STATE_FORMAT = 1
+
+
+def print_header(hdr: str):
+    """Framed header with lines of '=' above and below and a blank line before/after."""
+    line = "=" * len(hdr)
+    print(f"\n{line}\n{hdr}\n{line}\n")
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                     stage output                       #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+class StageOutput(io.TextIOBase):
+    """
+    Stand-in for sys.stdout/sys.stderr: writes made by a thread running a stage
+    go to that stage's buffer, everything else to the real stream. Stages run
+    concurrently, so their output is collected and printed as a block instead
+    of being interleaved.
+    """
+
+    def __init__(self, stream, local: threading.local):
+        self.stream = stream
+        self.local = local
+
+    def write(self, s: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        (buffer if buffer is not None else self.stream).write(s)
+        return len(s)
+
+    def flush(self):
+        self.stream.flush()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                      fingerprints                      #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def display_path(path: Path) -> str:
+    """path relative to the repository when inside it (e.g. not the game folder)."""
+    return (path.relative_to(ROOT_DIR) if path.is_relative_to(ROOT_DIR) else path).as_posix()
+
+
+def tree_stats(paths, exclude=("bin", "obj", ".cache", "__pycache__")) -> list:
+    """
+    (path, mtime_ns, size) of every file under paths (files or folders), sorted.
+    exclude applies to folders below the given ones (e.g. a deployed bin/ folder
+    can itself be listed).
+    """
+    stats = []
+    for path in paths:
+        if path.is_file():
+            candidates = [path]
+        elif path.is_dir():
+            candidates = (p for p in path.rglob("*") if not any(part in exclude for part in p.relative_to(path).parts))
+        else:
+            stats.append((display_path(path), None, None))
+            continue
+        for p in candidates:
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if p.is_file():
+                stats.append((display_path(p), st.st_mtime_ns, st.st_size))
+    return sorted(stats)
+
+
+def fingerprint(paths, options) -> str:
+    data = json.dumps([tree_stats(paths), options], sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def load_state() -> dict:
+    try:
+        state = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get("format") != STATE_FORMAT:
+        return {}
+    return state.get("stages", {})
+
+
+def save_state(stages: dict):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    tmp.write_text(json.dumps({"format": STATE_FORMAT, "stages": stages}, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(STATE_PATH)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                         stages                         #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+@dataclass
+class Stage:
+    name: str
+    action: object  # () -> bool (success)
+    deps: list[str] = field(default_factory=list)
+    # () -> [paths] whose stats (plus options) decide if the stage is up to date;
+    # None = always run
+    inputs: object = None
+    options: dict = field(default_factory=dict)
+
+    def fingerprint(self) -> str | None:
+        return None if self.inputs is None else fingerprint(self.inputs(), self.options)
+
+
+def game_module_dir(module: str) -> Path | None:
+    """
+    The folder msbuild deploys module to ($(DeployDir)): $(BannerlordGameDir)/Modules/<module>,
+    with BannerlordGameDir from Retinues.Local.props, else the default in Directory.Build.props.
+    """
+    for props in (ROOT_DIR / "Retinues.Local.props", ROOT_DIR / "Directory.Build.props"):
+        try:
+            text = props.read_text(encoding="utf-8")
+        except OSError:
+            continue
+        match = re.search(r"<BannerlordGameDir>(.*?)</BannerlordGameDir>", text, re.S)
+        if match:
+            return Path(html.unescape(match.group(1).strip())) / "Modules" / module
+    return None
+
+
+def run_command(cmd: list[str]) -> bool:
+    """Run a command, sending its combined output to the stage output."""
+    print(f"$ {' '.join(cmd)}")
+    try:
+        proc = subprocess.run(cmd, cwd=ROOT_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except OSError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return False
+    print(proc.stdout, end="")
+    return proc.returncode == 0
+
+
+def bump_submodule_version(module: str, patch: str) -> bool:
+    """
+    Set the last segment of <Version value="vX.Y.Z.N" /> in the module's SubModule*.xml files.
+    Files are edited as bytes (line endings kept, as sed -i did) and only rewritten when the
+    version changes, so an unchanged patch keeps the downstream stage fingerprints valid.
+    """
+    core_dir = ROOT_DIR / "src" / module
+    pattern = re.compile(rb'(<Version\s+value="v[0-9]+\.[0-9]+\.[0-9]+\.)([0-9]+)"')
+    found = False
+    for name in ("SubModule.BL12.xml", "SubModule.BL13.xml", "SubModule.BL14.xml", "SubModule.xml"):
+        path = core_dir / name
+        if not path.is_file():
+            continue
+        found = True
+        data = path.read_bytes()
+        updated = pattern.sub(lambda m: m.group(1) + patch.encode("ascii") + b'"', data)
+        if updated == data:
+            print(f"  - Version patch already {patch} in {name}")
+            continue
+        path.write_bytes(updated)
+        print(f"  - Set version patch -> {patch} in {name}")
+    if not found:
+        print(f"  (No SubModule*.xml found under {core_dir}; skipped)")
+    return True
+
+
+def module_stages(module: str, args, reports: list) -> list[Stage]:
+    """The stages of one module, according to the command-line options."""
+    proj = ROOT_DIR / "src" / module / f"{module}.csproj"
+    tpl_dir = render_prefabs.SCRIPT_DIR / module
+    gui_dir = render_prefabs.OUTPUT_BASE / module
+    loc_dir = ROOT_DIR / "loc" / module
+    config = "Release" if args.release else "Debug"
+    # Deployed files are part of the deploying stages' fingerprints, so wiping
+    # or editing the game's module folder deploys again
+    game_dir = game_module_dir(module) if args.deploy else None
+    stages = []
+
+    if args.release:
+        stages.append(Stage(f"bump:{module}", lambda: bump_submodule_version(module, args.release)))
+
+    run_prefabs = args.run_prefabs and tpl_dir.is_dir()
+    if run_prefabs:
+        targets = render_prefabs.parse_targets(f"{args.version},14:_BL14")
+        # Release builds ship compact prefabs; development builds keep them readable
+        minify = bool(args.release)
+
+        def prefabs() -> bool:
+            timings = Timings(f"prefabs:{module}", enabled=args.timings, trace_memory=args.timings)
+            # Outputs rendered in any checkout before are copied from the shared render cache
+            cache = render_prefabs.open_cache()
+            try:
+                ok = render_prefabs.process_module(tpl_dir, targets, timings=timings, minify=minify, cache=cache)
+            finally:
+                if cache is not None:
+                    cache.close()
+            reports.append(timings.report())
+            return ok
+
+        stages.append(
+            Stage(
+                f"prefabs:{module}",
+                prefabs,
+                inputs=lambda: [
+                    tpl_dir,
+                    render_prefabs.SCRIPT_DIR / "_macros",
+                    Path(render_prefabs.__file__),
+                    render_prefabs.SCRIPT_DIR / "render_cache.py",
+                    ROOT_DIR / "tools" / "timings.py",
+                    gui_dir,
+                ],
+                options={"targets": [list(t) for t in targets], "minify": minify},
+            )
+        )
+
+    run_strings = args.run_strings and (ROOT_DIR / "src" / module).is_dir()
+    if run_strings:
+
+        def sync_strings() -> bool:
+            timings = Timings(f"strings:{module}", enabled=args.timings, trace_memory=args.timings)
+            status = strings.run(strings.parse_args(["--module", module]), timings)
+            reports.append(timings.report())
+            return status == 0
+
+        stages.append(
+            Stage(
+                f"strings:{module}",
+                sync_strings,
+                # The version bump edits SubModule*.xml under src/<M>, which this stage fingerprints
+                deps=[f"bump:{module}"] if args.release else [],
+                inputs=lambda: [
+                    ROOT_DIR / "src" / module,
+                    loc_dir,
+                    Path(strings.__file__),
+                    ROOT_DIR / "loc" / "string_store.py",
+                    ROOT_DIR / "loc" / "strpack.py",
+                    ROOT_DIR / "tools" / "timings.py",
+                ],
+            )
+        )
+
+    run_main = args.run_main and proj.is_file()
+    if run_prefabs and args.deploy and proj.is_file() and not run_main:
+        stages.append(
+            Stage(
+                f"deploy-gui:{module}",
+                lambda: run_command(
+                    ["dotnet", "msbuild", str(proj), "-t:DeployPrefabsOnly", f"-p:BL={args.version}",
+                     "-p:DeployToGame=true", f"-p:ModuleName={module}"]
+                ),
+                deps=[f"prefabs:{module}"],
+                inputs=lambda: [gui_dir, ROOT_DIR / "Retinues.Local.props", *([game_dir / "GUI"] if game_dir else [])],
+                options={"bl": args.version},
+            )
+        )
+
+    if run_main:
+        deps = [s.name for s in stages]
+        stages.append(
+            Stage(
+                f"build:{module}",
+                lambda: run_command(
+                    ["dotnet", "build", str(proj), "-c", config, f"-p:DeployToGame={str(args.deploy).lower()}",
+                     f"-p:BL={args.version}", f"-p:ModuleName={module}"]
+                ),
+                deps=deps,
+                inputs=lambda: [
+                    ROOT_DIR / "src" / module,
+                    ROOT_DIR / "xml" / module,
+                    loc_dir / "Languages",
+                    gui_dir,
+                    ROOT_DIR / "Directory.Build.props",
+                    ROOT_DIR / "Directory.Build.targets",
+                    ROOT_DIR / "Retinues.Local.props",
+                    ROOT_DIR / "dll" / args.version,
+                    ROOT_DIR / "out" / "bin",
+                    *(
+                        [game_dir / "SubModule.xml", game_dir / "bin", game_dir / "GUI", game_dir / "ModuleData"]
+                        if game_dir
+                        else []
+                    ),
+                ],
+                options={"config": config, "bl": args.version, "deploy": args.deploy},
+            )
+        )
+
+    return stages
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                        scheduler                       #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def run_graph(stages: list[Stage], jobs: int, force: bool) -> tuple[bool, list[tuple[str, float]]]:
+    """
+    Run stages as soon as their dependencies succeeded, up to jobs at a time.
+    A failed stage fails its dependents; independent stages still run.
+    Returns (success, [(stage, seconds)] of the stages that ran).
+    """
+    by_name = {s.name: s for s in stages}
+    state = load_state()
+    status: dict[str, str] = {}  # name -> "ok" | "skipped" | "failed"
+    durations = []
+    local = threading.local()
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = StageOutput(real_stdout, local), StageOutput(real_stderr, local)
+
+    def execute(stage: Stage) -> tuple[str, str, float]:
+        local.buffer = io.StringIO()
+        t0 = time.perf_counter()
+        try:
+            before = None if force else stage.fingerprint()
+            if before is not None and state.get(stage.name) == before:
+                return "skipped", "", 0.0
+            try:
+                ok = stage.action()
+            except Exception as e:
+                print(f"[ERROR] {type(e).__name__}: {e}", file=sys.stderr)
+                ok = False
+            if ok and stage.inputs is not None:
+                state[stage.name] = stage.fingerprint()
+            elif not ok:
+                state.pop(stage.name, None)
+            return ("ok" if ok else "failed"), local.buffer.getvalue(), time.perf_counter() - t0
+        finally:
+            local.buffer = None
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            running = {}
+            while len(status) < len(stages):
+                for stage in stages:
+                    if stage.name in status or stage.name in running.values():
+                        continue
+                    dep_status = [status.get(d) for d in stage.deps if d in by_name]
+                    if "failed" in dep_status:
+                        status[stage.name] = "failed"
+                        print(f"[ERROR] {stage.name}: not run, a dependency failed", file=real_stderr)
+                    elif all(s in ("ok", "skipped") for s in dep_status):
+                        print(f"[INFO] {stage.name} started")
+                        running[pool.submit(execute, stage)] = stage.name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result, output, seconds = future.result()
+                    status[name] = result
+                    if result == "skipped":
+                        print(f"[OK] {name}: up to date, skipped")
+                        continue
+                    durations.append((name, seconds))
+                    print_header(f"=   {name} ({seconds:.1f}s)   =")
+                    print(output, end="")
+                    if result == "failed":
+                        print(f"[ERROR] {name} failed", file=real_stderr)
+    finally:
+        sys.stdout, sys.stderr = real_stdout, real_stderr
+        save_state(state)
+
+    return all(s != "failed" for s in status.values()), durations
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                          main                          #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Build, render and deploy Bannerlord modules")
+    ap.add_argument("--no-deploy", dest="deploy", action="store_false", help="Do not copy to game Modules")
+    ap.add_argument("--prefabs", action="store_true", help="Only run prefabs generation")
+    ap.add_argument("--no-prefabs", action="store_true", help="Skip prefabs generation")
+    ap.add_argument("--strings", action="store_true", help="Only run strings.py")
+    ap.add_argument("--no-strings", action="store_true", help="Skip strings.py")
+    ap.add_argument("-v", "--version", default="13", choices=("12", "13", "14"), help="Bannerlord version (default: 13)")
+    ap.add_argument("-r", "--release", metavar="N", help='Build Release and set <Version value="vX.Y.Z.N" /> to N')
+    ap.add_argument(
+        "--module",
+        action="append",
+        help="Module to build; repeat or comma-separate for several (default: Retinues)",
+    )
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="Stages run at the same time (0 = one per CPU, default: 0)")
+    ap.add_argument("--force", action="store_true", help="Run every stage, even those whose inputs are unchanged")
+    ap.add_argument("--timings", action="store_true", help="Print a per-phase build-time breakdown at the end")
+    args = ap.parse_args(argv)
+
+    if args.release is not None and not args.release.isdigit():
+        ap.error(f"--release value must be numeric, got: {args.release}")
+    args.modules = list(dict.fromkeys(m for value in (args.module or ["Retinues"]) for m in value.split(",") if m))
+
+    # Same selection rules as the former build.sh flags
+    args.run_main = not (args.prefabs or args.strings)
+    args.run_prefabs = not args.no_prefabs and not args.strings
+    args.run_strings = not args.no_strings and not args.prefabs
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    print_header(f"=   {', '.join(args.modules)} Build   =")
+    print(f"  BL      : {args.version}")
+    print(f"  Build   : {str(args.run_main).lower()}")
+    print(f"  Prefabs : {str(args.run_prefabs).lower()}")
+    print(f"  Strings : {str(args.run_strings).lower()}")
+    print(f"  Config  : {'Release' if args.release else 'Debug'}")
+    print(f"  Deploy  : {str(args.deploy).lower()}")
+    if args.release:
+        print(f"  Release : {args.release}")
+    print()
+
+    reports = []
+    stages = [stage for module in args.modules for stage in module_stages(module, args, reports)]
+    ok, durations = run_graph(stages, jobs=args.jobs or os.cpu_count() or 1, force=args.force)
+
+    print_header("=   Build Finished   =" if ok else "=   Build Failed   =")
+    if args.timings:
+        print("Build time breakdown:")
+        python_stages = {report["tool"] for report in reports}
+        steps = [(name, seconds) for name, seconds in durations if name not in python_stages]
+        steps.append(("total (wall)", time.perf_counter() - started))
+        print(summarize(reports, steps))
+        print()
+    print(f"{'✅' if ok else '❌'} {time.strftime('%a %b %d %H:%M:%S %Z %Y')}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
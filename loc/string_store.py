@@ -0,0 +1,353 @@
+"""
+Indexed translation store backing strings.py.
+
+strings.json stays the committed, human-edited source of translations; this
+module keeps a local SQLite index of it (git-ignored) so a sync only touches
+what changed:
+- strings.json is re-imported only when its content hash differs from the
+  last import/export,
+- EN defaults from the code scan are upserted row by row,
+- strings.json and per-locale XMLs are only re-rendered when dirty,
+- per-locale coverage is a single indexed query.
+It also indexes where each key is used in the C# code (file, line, fallback
+text), updated per changed file, for the strings.py query commands.
+Every field of every entry is stored with its position, so export_json()
+reproduces the exact strings.json layout.
+"""
+
+import json
+import sqlite3
+import hashlib
+
+from pathlib import Path
+
+# Bump when the schema changes; an older store is dropped and re-imported
+STORE_FORMAT = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS strings (
+    id       TEXT PRIMARY KEY,
+    sort_key TEXT NOT NULL,    -- id.lower(), the strings.json order
+    seq      INTEGER NOT NULL  -- insertion order, breaks sort_key ties like a stable sort
+);
+CREATE TABLE IF NOT EXISTS fields (
+    id    TEXT NOT NULL,
+    name  TEXT NOT NULL,     -- "id", "EN" or a locale code
+    value TEXT NOT NULL,     -- JSON-encoded value ("null" when untranslated)
+    pos   INTEGER NOT NULL,  -- key position inside the JSON entry
+    PRIMARY KEY (id, name)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    file   TEXT PRIMARY KEY,  -- .cs file with L.S/L.T calls, relative to the module source root
+    digest TEXT NOT NULL      -- hash of its hits: unchanged files are not rewritten
+);
+CREATE TABLE IF NOT EXISTS usages (
+    id   TEXT NOT NULL,     -- full key (with the "ret_" prefix)
+    file TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    text TEXT NOT NULL      -- fallback text given at this call
+);
+CREATE INDEX IF NOT EXISTS strings_order ON strings (sort_key, seq);
+CREATE INDEX IF NOT EXISTS fields_name ON fields (name, value);
+CREATE INDEX IF NOT EXISTS usages_id ON usages (id);
+CREATE INDEX IF NOT EXISTS usages_file ON usages (file);
+"""
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class StringStore:
+    """
+    SQLite index of strings.json. All changes happen in one transaction:
+    call commit() to keep them (strings.py --check never does).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.db = self._open(path)
+        self.dirty_json = False  # strings.json must be re-exported
+        self.dirty_locales = False  # translations changed: locale XMLs must be re-rendered
+
+    @staticmethod
+    def _open(path: Path) -> sqlite3.Connection:
+        try:
+            db = sqlite3.connect(path, isolation_level="DEFERRED")
+            db.executescript(SCHEMA)
+            row = db.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+            if row is not None and row[0] == str(STORE_FORMAT):
+                return db
+            db.close()
+        except sqlite3.DatabaseError:
+            pass
+
+        # Missing, outdated or corrupted: start over, strings.json is re-imported
+        path.unlink(missing_ok=True)
+        db = sqlite3.connect(path, isolation_level="DEFERRED")
+        db.executescript(SCHEMA)
+        db.execute("INSERT INTO meta (key, value) VALUES ('format', ?)", (str(STORE_FORMAT),))
+        db.commit()
+        return db
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    #                          meta                          #
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+    def get_meta(self, key: str) -> str | None:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.db.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    #                   strings.json import                  #
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+    def sync_json(self, json_path: Path, backup: bool = True) -> bool:
+        """
+        Re-import strings.json if it changed since it was last imported or exported.
+        A missing file means no translations yet, as it always did: the store is
+        emptied and strings.json is exported again from the EN defaults only.
+        A corrupted file is backed up to strings.json.bak (unless backup is False)
+        and the store keeps its last good content, which is exported back.
+        Returns True if the file was (re)imported (or found missing).
+        """
+        try:
+            data = json_path.read_bytes()
+        except OSError:
+            data = None
+        if data is not None and sha256(data) == self.get_meta("json_sha256"):
+            return False
+
+        self.dirty_json = True
+        self.dirty_locales = True
+        if data is None:
+            self.db.execute("DELETE FROM strings")
+            self.db.execute("DELETE FROM fields")
+            self.set_meta("json_sha256", "")
+            return True
+
+        try:
+            items = json.loads(data.decode("utf-8"))
+            if not isinstance(items, list):
+                raise ValueError("strings.json must contain a list")
+        except Exception:
+            if backup:
+                json_path.rename(json_path.with_suffix(".json.bak"))
+            return False
+
+        # Same normalization as before: keep entries with an id and an EN text,
+        # a duplicated id keeps its first position and its last content
+        by_id = {}
+        for item in items:
+            if isinstance(item, dict) and "id" in item and "EN" in item:
+                by_id[item["id"]] = item
+
+        self.db.execute("DELETE FROM strings")
+        self.db.execute("DELETE FROM fields")
+        self.db.executemany(
+            "INSERT INTO strings (id, sort_key, seq) VALUES (?, ?, ?)",
+            ((_id, str(_id).lower(), seq) for seq, _id in enumerate(by_id)),
+        )
+        self.db.executemany(
+            "INSERT INTO fields (id, name, value, pos) VALUES (?, ?, ?, ?)",
+            (
+                (_id, name, json.dumps(value, ensure_ascii=False), pos)
+                for _id, item in by_id.items()
+                for pos, (name, value) in enumerate(item.items())
+            ),
+        )
+        self.set_meta("json_sha256", sha256(data))
+        return True
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    #                 incremental updates                    #
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+    def ids(self) -> set[str]:
+        return {row[0] for row in self.db.execute("SELECT id FROM strings")}
+
+    def en_defaults(self) -> dict[str, str]:
+        """{id: EN text}, in strings.json order."""
+        rows = self.db.execute(
+            "SELECT s.id, f.value FROM strings s JOIN fields f ON f.id = s.id AND f.name = 'EN' "
+            "ORDER BY s.sort_key, s.seq"
+        )
+        return {_id: json.loads(value) for _id, value in rows}
+
+    def upsert_defaults(self, ids_to_default: dict[str, str], locale_codes: list[str]) -> list[str]:
+        """
+        Insert new keys (EN + a null per locale) and refresh EN texts that differ.
+        Only changed rows are written. Returns the ids that were added or updated.
+        """
+        current = self.en_defaults()
+        changed = []
+        next_seq = self.db.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM strings").fetchone()[0]
+
+        for _id, default_text in ids_to_default.items():
+            value = json.dumps(default_text, ensure_ascii=False)
+            if _id in current:
+                if current[_id] == default_text:
+                    continue
+                self.db.execute("UPDATE fields SET value = ? WHERE id = ? AND name = 'EN'", (value, _id))
+            else:
+                self.db.execute(
+                    "INSERT INTO strings (id, sort_key, seq) VALUES (?, ?, ?)", (_id, _id.lower(), next_seq)
+                )
+                next_seq += 1
+                self.db.executemany(
+                    "INSERT INTO fields (id, name, value, pos) VALUES (?, ?, ?, ?)",
+                    [(_id, "id", json.dumps(_id, ensure_ascii=False), 0), (_id, "EN", value, 1)]
+                    + [(_id, lc, "null", pos) for pos, lc in enumerate(locale_codes, start=2)],
+                )
+            changed.append(_id)
+
+        if changed:
+            self.dirty_json = True
+        return changed
+
+    def ensure_locales(self, locale_codes: list[str]) -> int:
+        """
+        Give every entry (including legacy ones no longer in code) a null value
+        for each locale it lacks, appended after its existing keys.
+        Returns the number of values added.
+        """
+        added = 0
+        for lc in locale_codes:
+            cur = self.db.execute(
+                "INSERT INTO fields (id, name, value, pos) "
+                "SELECT s.id, ?, 'null', (SELECT MAX(pos) + 1 FROM fields f WHERE f.id = s.id) "
+                "FROM strings s WHERE NOT EXISTS (SELECT 1 FROM fields f WHERE f.id = s.id AND f.name = ?)",
+                (lc, lc),
+            )
+            added += cur.rowcount
+        if added:
+            self.dirty_json = True
+        return added
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    #                     export & queries                   #
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+    def export_json(self) -> str:
+        """Render the store as strings.json, in exactly the format strings.py always wrote."""
+        entries = []
+        current_id, entry = None, None
+        rows = self.db.execute(
+            "SELECT s.id, f.name, f.value FROM strings s JOIN fields f ON f.id = s.id "
+            "ORDER BY s.sort_key, s.seq, f.pos"
+        )
+        for _id, name, value in rows:
+            if _id != current_id:
+                current_id, entry = _id, {}
+                entries.append(entry)
+            entry[name] = json.loads(value)
+        return json.dumps(entries, ensure_ascii=False, indent=2) + "\n"
+
+    def locale_strings(self, locale_code: str) -> list[tuple[str, str]]:
+        """(id, text) of every translated entry for locale_code, in strings.json order."""
+        rows = self.db.execute(
+            "SELECT s.id, f.value FROM strings s JOIN fields f ON f.id = s.id AND f.name = ? "
+            "WHERE f.value != 'null' ORDER BY s.sort_key, s.seq",
+            (locale_code,),
+        )
+        return [(_id, str(json.loads(value))) for _id, value in rows]
+
+    def coverage(self, locale_codes: list[str]) -> dict[str, tuple[int, int]]:
+        """{locale: (translated, total)} over every key in the store."""
+        total = self.db.execute("SELECT COUNT(*) FROM strings").fetchone()[0]
+        counts = dict(
+            self.db.execute(
+                "SELECT name, COUNT(*) FROM fields WHERE name NOT IN ('id', 'EN') AND value != 'null' GROUP BY name"
+            )
+        )
+        return {lc: (counts.get(lc, 0), total) for lc in locale_codes}
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    #                     key usage index                    #
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+    def sync_usages(self, files: dict[str, list[tuple[str, int, str]]]) -> int:
+        """
+        Update the usage index from {file: [(id, line, text), ...]} covering every
+        file with calls: files whose hits changed are replaced, files no longer
+        present are dropped. Returns the number of files updated.
+        """
+        known = dict(self.db.execute("SELECT file, digest FROM sources"))
+        gone = known.keys() - files.keys()
+        for file in gone:
+            self.db.execute("DELETE FROM usages WHERE file = ?", (file,))
+            self.db.execute("DELETE FROM sources WHERE file = ?", (file,))
+
+        updated = len(gone)
+        for file, hits in files.items():
+            digest = sha256(json.dumps(hits, ensure_ascii=False).encode("utf-8"))
+            if known.get(file) == digest:
+                continue
+            self.db.execute("DELETE FROM usages WHERE file = ?", (file,))
+            self.db.executemany(
+                "INSERT INTO usages (id, file, line, text) VALUES (?, ?, ?, ?)",
+                ((_id, file, line, text) for _id, line, text in hits),
+            )
+            self.db.execute(
+                "INSERT INTO sources (file, digest) VALUES (?, ?) "
+                "ON CONFLICT (file) DO UPDATE SET digest = excluded.digest",
+                (file, digest),
+            )
+            updated += 1
+        return updated
+
+    def has_usages(self) -> bool:
+        return self.db.execute("SELECT 1 FROM sources LIMIT 1").fetchone() is not None
+
+    def usages(self, _id: str) -> list[tuple[str, int, str]]:
+        """(file, line, text) of every call using _id, in file and line order."""
+        return self.db.execute(
+            "SELECT file, line, text FROM usages WHERE id = ? ORDER BY file, line", (_id,)
+        ).fetchall()
+
+    def orphans(self) -> list[str]:
+        """Ids of strings.json entries no call uses anymore, in strings.json order."""
+        rows = self.db.execute(
+            "SELECT id FROM strings s WHERE NOT EXISTS (SELECT 1 FROM usages u WHERE u.id = s.id) "
+            "ORDER BY s.sort_key, s.seq"
+        )
+        return [row[0] for row in rows]
+
+    def conflicts(self) -> dict[str, list[tuple[str, int, str]]]:
+        """{id: (file, line, text) of every call} for ids used with more than one fallback text."""
+        rows = self.db.execute(
+            "SELECT id, file, line, text FROM usages WHERE id IN "
+            "(SELECT id FROM usages GROUP BY id HAVING COUNT(DISTINCT text) > 1) "
+            "ORDER BY lower(id), id, file, line"
+        )
+        conflicts = {}
+        for _id, file, line, text in rows:
+            conflicts.setdefault(_id, []).append((file, line, text))
+        return conflicts
+
+    def untranslated(self, locale_code: str) -> list[tuple[str, str]]:
+        """(id, EN text) of the keys used in code that have no locale_code translation, in strings.json order."""
+        rows = self.db.execute(
+            "SELECT s.id, en.value FROM strings s JOIN fields en ON en.id = s.id AND en.name = 'EN' "
+            "WHERE EXISTS (SELECT 1 FROM usages u WHERE u.id = s.id) "
+            "AND NOT EXISTS (SELECT 1 FROM fields f WHERE f.id = s.id AND f.name = ? AND f.value != 'null') "
+            "ORDER BY s.sort_key, s.seq",
+            (locale_code,),
+        )
+        return [(_id, str(json.loads(value))) for _id, value in rows]
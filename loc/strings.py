@@ -4,14 +4,32 @@
 Localization string extractor and synchronizer:
 - Scans .cs files for L.S("key", "text") calls
 - Keeps strings.json and per-locale XML files in sync.
+- Keeps an index of where each key is used (file, line, fallback text), which
+  the query commands answer from without scanning the C# tree:
+
+  python loc/strings.py [--module M] where <key>          # call sites and fallbacks of a key
+  python loc/strings.py [--module M] orphans              # keys in strings.json no longer used in code
+  python loc/strings.py [--module M] conflicts            # keys used with differing fallbacks
+  python loc/strings.py [--module M] untranslated <LOCALE>
+
+  The index is as recent as the last sync (a plain `strings.py` run or build).
 """
 
+import os
 import sys
 import re
 import json
+import hashlib
 import argparse
 
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from string_store import StringStore, sha256
+from strpack import PACK_SUFFIX, build_pack, verify_pack
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+from timings import Timings, profiled  # noqa: E402
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
@@ -22,29 +40,30 @@ OUTPUT_REL = Path("Languages/ret_strings.xml")  # relative to this script (now i
 KEY_PREFIX = "ret_"
 JSON_NAME = "strings.json"  # next to this script
 LOCS_DIRNAME = "Languages"  # locales live under ./loc/Languages/<LOCALE>/
+SCAN_CACHE_NAME = ".scan_cache.json"  # per-file scan results, next to strings.json
+SCAN_CACHE_FORMAT = 2  # bump when the cache layout changes
+STORE_NAME = ".strings.db"  # indexed mirror of strings.json (see string_store.py)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
 #                        regexes                         #
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
 
-# Double-quoted: L.S("key", "text")
-RE_DQ = re.compile(
-    r"""L\.(?:S|T)\(\s*"(?P<key>(?:\\.|[^"\\])*)"\s*,\s*"(?P<text>(?:\\.|[^"\\])*)"\s*\)""",
+# All call forms, matched in a single pass over each file:
+RE_CALL = re.compile(
+    r"""L\.(?:S|T)\(\s*(?:"""
+    # Double-quoted: L.S("key", "text")
+    r""""(?P<dq_key>(?:\\.|[^"\\])*)"\s*,\s*"(?P<dq_text>(?:\\.|[^"\\])*)\""""
+    # Single-quoted: L.S('key', 'text')
+    r"""|'(?P<sq_key>(?:\\.|[^'\\])*)'\s*,\s*'(?P<sq_text>(?:\\.|[^'\\])*)'"""
+    # Verbatim strings: L.S(@"key", @"text")
+    r"""|@\"(?P<vb_key>(?:\"\"|[^"])*)\"\s*,\s*@\"(?P<vb_text>(?:\"\"|[^"])*)\""""
+    r""")\s*\)""",
     re.DOTALL,
 )
 
-# Single-quoted: L.S('key', 'text')
-RE_SQ = re.compile(
-    r"""L\.(?:S|T)\(\s*'(?P<key>(?:\\.|[^'\\])*)'\s*,\s*'(?P<text>(?:\\.|[^'\\])*)'\s*\)""",
-    re.DOTALL,
-)
-
-# Verbatim strings: L.S(@"key", @"text")
-RE_VB = re.compile(
-    r"""L\.(?:S|T)\(\s*@\"(?P<key>(?:\"\"|[^"])*)\"\s*,\s*@\"(?P<text>(?:\"\"|[^"])*)\"\s*\)""",
-    re.DOTALL,
-)
+# Byte-level pre-filter: a file containing none of these cannot match RE_CALL
+CALL_MARKERS = (b"L.S(", b"L.T(")
 
 
 def unescape_regular(s: str) -> str:
@@ -76,25 +95,168 @@ def xml_escape(s: str) -> str:
 
 
 def scan_file(path: Path):
-    text = path.read_text(encoding="utf-8", errors="ignore")
+    data = path.read_bytes()
+    if not any(marker in data for marker in CALL_MARKERS):
+        return []
+
+    # Same text as Path.read_text(): lenient decoding, universal newlines
+    text = data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
     hits = []
+    line, pos = 1, 0
+
+    for m in RE_CALL.finditer(text):
+        line += text.count("\n", pos, m.start())
+        pos = m.start()
+        if m.group("vb_key") is not None:
+            key = unescape_verbatim(m.group("vb_key"))
+            val = unescape_verbatim(m.group("vb_text"))
+        elif m.group("dq_key") is not None:
+            key = unescape_regular(m.group("dq_key"))
+            val = unescape_regular(m.group("dq_text"))
+        else:
+            key = unescape_regular(m.group("sq_key"))
+            val = unescape_regular(m.group("sq_text"))
+        hits.append((key, val, path, line))
+
+    return hits
 
-    for m in RE_DQ.finditer(text):
-        key = unescape_regular(m.group("key"))
-        val = unescape_regular(m.group("text"))
-        hits.append((key, val, path))
 
-    for m in RE_SQ.finditer(text):
-        key = unescape_regular(m.group("key"))
-        val = unescape_regular(m.group("text"))
-        hits.append((key, val, path))
+def scan_files(cs_files: list[Path], jobs: int = 1):
+    """
+    Yield scan_file() results for cs_files, in the order of cs_files.
+    With jobs != 1 the files are scanned across a process pool (0 = one per CPU);
+    results are still yielded in input order, so merging stays deterministic.
+    """
+    workers = jobs or os.cpu_count() or 1
+    if workers <= 1 or len(cs_files) < 2:
+        yield from map(scan_file, cs_files)
+        return
 
-    for m in RE_VB.finditer(text):
-        key = unescape_verbatim(m.group("key"))
-        val = unescape_verbatim(m.group("text"))
-        hits.append((key, val, path))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(cs_files) // (workers * 4))
+        yield from pool.map(scan_file, cs_files, chunksize=chunksize)
 
-    return hits
+
+def full_id(key: str) -> str:
+    return key if key.startswith(KEY_PREFIX) else f"{KEY_PREFIX}{key}"
+
+
+def collect_entries(hits_per_file):
+    """
+    Merge per-file scan hits into {full_id: (text, first_path)}.
+    The first occurrence (in file order, then source order) wins; differing
+    fallbacks for the same key are reported as warning messages.
+    Returns (entries, warnings).
+    """
+    entries = {}  # id -> (text, first_path)
+    warnings = []
+
+    for hits in hits_per_file:
+        for key, text, src, line in hits:
+            sid = full_id(key)
+
+            if sid in entries:
+                existing_text, first_src = entries[sid]
+                if existing_text != text:
+                    warnings.append(
+                        f"[WARN] Key '{sid}' has differing fallbacks:\n"
+                        f"       First: '{existing_text}' (from {first_src})\n"
+                        f"       New:   '{text}' (from {src}:{line})\n"
+                        f"       Using the first."
+                    )
+                continue
+
+            entries[sid] = (text, src)
+
+    return entries, warnings
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                    scan result cache                   #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def scanner_fingerprint() -> str:
+    """
+    Identify everything that shapes scan results; a cache written under a
+    different fingerprint (regexes, markers, key prefix, cache layout) is discarded.
+    """
+    parts = [str(SCAN_CACHE_FORMAT), RE_CALL.pattern, str(RE_CALL.flags), KEY_PREFIX, *map(repr, CALL_MARKERS)]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def load_scan_cache(cache_path: Path) -> dict:
+    """Return the {rel_path: record} map of a valid scan cache, or {}."""
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("fingerprint") != scanner_fingerprint():
+        return {}
+    files = data.get("files")
+    return files if isinstance(files, dict) else {}
+
+
+def save_scan_cache(cache_path: Path, files: dict):
+    tmp = cache_path.with_name(cache_path.name + ".tmp")
+    tmp.write_text(
+        json.dumps({"fingerprint": scanner_fingerprint(), "files": files}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    tmp.replace(cache_path)
+
+
+def scan_tree(
+    root: Path, cs_files: list[Path], jobs: int = 1, cache_path: Path | None = None, update_cache: bool = True
+):
+    """
+    Return (hits per file in cs_files order, number of files actually scanned).
+
+    With cache_path, files whose (mtime, size) or content hash match the cache
+    reuse their cached (key, text) hits; only changed or added files are scanned,
+    and deleted files drop out when the cache is written back (unless update_cache is False).
+    """
+    if cache_path is None:
+        return list(scan_files(cs_files, jobs)), len(cs_files)
+
+    cached = load_scan_cache(cache_path)
+    files = {}  # rel -> record, for the cache written back
+    hits_per_file = [None] * len(cs_files)
+    to_scan = []  # (index, rel, stat, digest)
+
+    for i, path in enumerate(cs_files):
+        rel = path.relative_to(root).as_posix()
+        st = path.stat()
+        record = cached.get(rel)
+        if record and record.get("mtime_ns") == st.st_mtime_ns and record.get("size") == st.st_size:
+            files[rel] = record
+            continue
+
+        # Touched but maybe not changed (checkout, editor save): compare content
+        h = hashlib.sha256(path.read_bytes()).hexdigest()
+        if record and record.get("sha256") == h:
+            files[rel] = {**record, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+            continue
+
+        to_scan.append((i, rel, st, h))
+
+    for (i, rel, st, h), hits in zip(to_scan, scan_files([cs_files[i] for i, *_ in to_scan], jobs)):
+        files[rel] = {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha256": h,
+            "hits": [[key, text, line] for key, text, _, line in hits],
+        }
+        hits_per_file[i] = hits
+
+    for i, path in enumerate(cs_files):
+        if hits_per_file[i] is None:
+            rel = path.relative_to(root).as_posix()
+            hits_per_file[i] = [(key, text, path, line) for key, text, line in files[rel]["hits"]]
+
+    if update_cache and files != cached:
+        save_scan_cache(cache_path, files)
+    return hits_per_file, len(to_scan)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
@@ -116,95 +278,73 @@ def list_locale_codes(loc_root: Path) -> list[str]:
     return codes
 
 
-def load_or_init_json(json_path: Path) -> list[dict]:
-    if json_path.exists():
-        try:
-            data = json.loads(json_path.read_text(encoding="utf-8"))
-            if not isinstance(data, list):
-                raise ValueError("strings.json must contain a list")
-            # Normalize entries to ensure an 'id' exists (for resilience if a manual edit removed it)
-            normalized = []
-            for item in data:
-                if isinstance(item, dict) and "id" in item and "EN" in item:
-                    normalized.append(item)
-            return normalized
-        except Exception:
-            # If corrupted, back it up and re-init
-            json_path.rename(json_path.with_suffix(".json.bak"))
-    return []
-
-
-def ensure_json_contains_all_keys(
-    json_list: list[dict], ids_to_default: dict[str, str], locale_codes: list[str]
-) -> list[dict]:
+def render_strings_xml(language: str, strings) -> str:
     """
-    Merge scan results into the json list:
-    - Add missing keys with EN + nulls per locale.
-    - Refresh EN text from current scan.
-    - Add any new locale codes with null.
+    Render a Bannerlord string table for (id, text) pairs, in the given order.
     """
-    # Index existing by id
-    by_id = {d["id"]: d for d in json_list if isinstance(d, dict) and "id" in d}
-
-    # Add/update current keys
-    for _id, default_text in ids_to_default.items():
-        if _id in by_id:
-            entry = by_id[_id]
-            entry["EN"] = default_text
-        else:
-            entry = {"id": _id, "EN": default_text}
-            by_id[_id] = entry
-        # Ensure locales present
-        for lc in locale_codes:
-            if lc not in entry:
-                entry[lc] = None
-
-    # Also ensure every entry has all locales (including legacy entries no longer found)
-    for entry in by_id.values():
-        for lc in locale_codes:
-            if lc not in entry:
-                entry[lc] = None
-
-    # Return stable order by id
-    return [by_id[k] for k in sorted(by_id.keys(), key=str.lower)]
-
-
-def write_json(json_path: Path, json_list: list[dict]):
-    json_path.write_text(
-        json.dumps(json_list, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
-    )
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<base xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:xsd="http://www.w3.org/2001/XMLSchema" type="string">\n',
+        "  <tags>\n",
+        f'    <tag language="{xml_escape(language)}" />\n',
+        "  </tags>\n",
+        "  <strings>\n",
+    ]
+    for sid, txt in strings:
+        parts.append(f'    <string\n      id="{xml_escape(sid)}"\n      text="{xml_escape(txt)}" />\n')
+    parts.append("  </strings>\n")
+    parts.append("</base>")
+    return "".join(parts)
+
+
+def file_sha256(path: Path) -> str | None:
+    try:
+        return sha256(path.read_bytes())
+    except OSError:
+        return None
 
 
-def write_locale_xml(locale_dir: Path, locale_code: str, json_list: list[dict]):
+class OutputWriter:
     """
-    Write ./loc/<LOCALE>/ret_strings.xml.
-    Only include <string> elements where entry[locale_code] is not None.
+    Writes generated files only when their content changed, atomically
+    (temporary sibling + rename), so unchanged outputs keep their mtime and
+    msbuild's deploy step doesn't copy them again.
+    In check mode nothing is written; changes are only recorded.
     """
-    locale_dir.mkdir(parents=True, exist_ok=True)
-    out_path = locale_dir / "ret_strings.xml"
-    strings = [
-        (d["id"], d.get(locale_code))
-        for d in json_list
-        if isinstance(d, dict) and "id" in d
-    ]
-    # Filter nulls
-    strings = [(sid, txt) for (sid, txt) in strings if txt is not None]
 
-    with out_path.open("w", encoding="utf-8", newline="\n") as f:
-        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
-        f.write(
-            '<base xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:xsd="http://www.w3.org/2001/XMLSchema" type="string">\n'
-        )
-        f.write("  <tags>\n")
-        f.write(f'    <tag language="{xml_escape(locale_code)}" />\n')
-        f.write("  </tags>\n")
-        f.write("  <strings>\n")
-        for sid, txt in strings:
-            f.write(
-                f'    <string\n      id="{xml_escape(sid)}"\n      text="{xml_escape(str(txt))}" />\n'
-            )
-        f.write("  </strings>\n")
-        f.write("</base>")
+    def __init__(self, check: bool = False):
+        self.check = check
+        self.changed: list[Path] = []
+        self.total = 0
+
+    @staticmethod
+    def encode(text: str, newline: str = "\n") -> bytes:
+        return text.replace("\n", newline).encode("utf-8")
+
+    def skip(self, count: int = 1):
+        """Account for outputs known to be up to date without rendering them."""
+        self.total += count
+
+    def write(self, path: Path, text: str, newline: str = "\n") -> bool:
+        """Write text to path unless identical bytes are already there; return True if changed."""
+        return self.write_bytes(path, self.encode(text, newline))
+
+    def write_bytes(self, path: Path, data: bytes) -> bool:
+        self.total += 1
+        try:
+            current = path.read_bytes()
+        except OSError:
+            current = None
+        if current is not None and hashlib.sha256(current).digest() == hashlib.sha256(data).digest():
+            return False
+
+        self.changed.append(path)
+        if not self.check:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        return True
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
@@ -212,65 +352,83 @@ def write_locale_xml(locale_dir: Path, locale_code: str, json_list: list[dict]):
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
 
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
     # Pick module (defaults to Retinues); paths adjust accordingly
     ap = argparse.ArgumentParser()
     ap.add_argument("--module", default="Retinues", help="Module name: default to Retinues")
-    args = ap.parse_args()
-
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="Processes used to scan .cs files (0 = one per CPU, default: 1)")
+    ap.add_argument("--no-cache", action="store_true", help=f"Rescan every .cs file, ignoring and not writing {SCAN_CACHE_NAME}")
+    ap.add_argument("--check", action="store_true", help="Write nothing; exit with status 1 if any output would change")
+    ap.add_argument("--coverage", action="store_true", help="Print per-locale translation coverage")
+    ap.add_argument(
+        "--timings",
+        type=Path,
+        metavar="FILE",
+        help="Write per-phase wall time and peak memory (discovery, scan, merge, JSON, each locale) as JSON",
+    )
+    ap.add_argument("--profile", type=Path, metavar="FILE", help="Run under cProfile and dump the stats to FILE")
+
+    # Query commands: answered from the key usage index, nothing is scanned or written
+    module_arg = argparse.ArgumentParser(add_help=False)
+    module_arg.add_argument("--module", default=argparse.SUPPRESS, help="Module name: default to Retinues")
+    sub = ap.add_subparsers(dest="command", metavar="COMMAND", help="Query the key usage index instead of syncing")
+    p_where = sub.add_parser("where", parents=[module_arg], help="Call sites and fallback texts of a key")
+    p_where.add_argument("key", help="Key, with or without the ret_ prefix")
+    sub.add_parser("orphans", parents=[module_arg], help="Keys in strings.json no longer used in code")
+    sub.add_parser("conflicts", parents=[module_arg], help="Keys used with differing fallback texts")
+    p_untranslated = sub.add_parser("untranslated", parents=[module_arg], help="Keys used in code without a translation")
+    p_untranslated.add_argument("locale", help="Locale code (a folder under Languages/)")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.command:
+        return query(args)
+    timings = Timings("strings", enabled=args.timings is not None, trace_memory=True)
+    with profiled(args.profile):
+        status = run(args, timings)
+    if args.timings:
+        timings.write(args.timings)
+    return status
+
+
+def run(args, timings: Timings) -> int:
+    """Extract and sync strings for args (see parse_args()); return the exit status."""
     script_dir = Path(__file__).resolve().parent
     mod = args.module
     root = (script_dir.parent / "src" / mod).resolve()
+    writer = OutputWriter(check=args.check)
+    verb = "Would write" if args.check else "Wrote"
 
     # Default EN XML goes under loc/<Module>/Languages/ret_strings.xml
     out_path = (script_dir / mod / OUTPUT_REL).resolve()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Collect
-    entries = {}  # id -> (text, first_path)
-    warnings = []
-
-    cs_files = list(root.rglob("*.cs"))
-    for cs in cs_files:
-        for key, text, src in scan_file(cs):
-            # prefix
-            full_id = key if key.startswith(KEY_PREFIX) else f"{KEY_PREFIX}{key}"
-
-            if full_id in entries:
-                existing_text, first_src = entries[full_id]
-                if existing_text != text:
-                    warnings.append(
-                        f"[WARN] Key '{full_id}' has differing fallbacks:\n"
-                        f"       First: '{existing_text}' (from {first_src})\n"
-                        f"       New:   '{text}' (from {src})\n"
-                        f"       Using the first."
-                    )
-                continue
-
-            entries[full_id] = (text, src)
+    # Collect (sorted, so first-occurrence resolution doesn't depend on the filesystem)
+    with timings.phase("discover"):
+        cs_files = sorted(root.rglob("*.cs"))
+    cache_path = None if args.no_cache else script_dir / mod / SCAN_CACHE_NAME
+    with timings.phase("scan"):
+        hits_per_file, scanned = scan_tree(
+            root, cs_files, jobs=args.jobs, cache_path=cache_path, update_cache=not args.check
+        )
+    with timings.phase("merge"):
+        entries, warnings = collect_entries(hits_per_file)
 
     # Write DEFAULT XML (unchanged behavior)
-    ids_sorted = sorted(entries.keys(), key=str.lower)
-    with out_path.open("w", encoding="utf-8", newline="\n") as f:
-        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
-        f.write(
-            '<base xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:xsd="http://www.w3.org/2001/XMLSchema" type="string">\n'
-        )
-        f.write("  <tags>\n")
-        f.write('    <tag language="English" />\n')
-        f.write("  </tags>\n")
-        f.write("  <strings>\n")
-        for _id in ids_sorted:
-            text, _ = entries[_id]
-            f.write(
-                f'    <string\n      id="{xml_escape(_id)}"\n      text="{xml_escape(text)}" />\n'
-            )
-        f.write("  </strings>\n")
-        f.write("</base>")
+    with timings.phase("locale", "EN"):
+        ids_sorted = sorted(entries.keys(), key=str.lower)
+        default_xml = render_strings_xml("English", ((_id, entries[_id][0]) for _id in ids_sorted))
+        changed = writer.write(out_path, default_xml)
+        # Packs are build outputs (not tracked): --check leaves them out
+        if not args.check:
+            writer.write_bytes(out_path.with_suffix(PACK_SUFFIX), build_pack((_id, entries[_id][0]) for _id in ids_sorted))
 
     # Report for default
     print(f"[OK] Extracted {len(ids_sorted)} strings from {len(cs_files)} .cs files.")
-    print(f"[OK] Wrote default XML: {out_path}")
+    if cache_path is not None:
+        print(f"[OK] Scanned {scanned} changed .cs files, reused {len(cs_files) - scanned} from cache.")
+    print(f"[OK] {verb} default XML: {out_path}" if changed else f"[OK] Default XML up to date: {out_path}")
     if warnings:
         print("\n".join(warnings), file=sys.stderr)
 
@@ -281,43 +439,190 @@ def main():
     loc_root = script_dir / mod / LOCS_DIRNAME
     locale_codes = list_locale_codes(loc_root)
 
-    # Log keys present in JSON but not in code
+    # strings.json is mirrored in an indexed store: it is only re-parsed when
+    # it changed, and only what changed is updated and re-rendered
     json_path = script_dir / mod / JSON_NAME
-    json_list = load_or_init_json(json_path)
-    json_ids = set(d["id"] for d in json_list if isinstance(d, dict) and "id" in d)
-    code_ids = set(entries.keys())
-    missing_in_code = json_ids - code_ids
-    if missing_in_code:
-        print(f"[INFO] {len(missing_in_code)} keys exist in JSON but not in code:")
-        for mid in sorted(missing_in_code):
-            print(f"       - {mid}")
-
-    # Log when EN value in JSON does not match code default
-    ids_sorted = sorted(entries.keys(), key=str.lower)
-    ids_to_default = {sid: entries[sid][0] for sid in ids_sorted}
-    for d in json_list:
-        if isinstance(d, dict) and "id" in d and "EN" in d:
-            _id = d["id"]
+    store = StringStore(script_dir / mod / STORE_NAME)
+    try:
+        if not json_path.exists():
+            print(f"[INFO] {json_path.name} not found: starting with no translations.")
+        with timings.phase("store"):
+            store.sync_json(json_path, backup=not args.check)
+
+        # Key usage index for the query commands: only files whose calls changed are rewritten
+        with timings.phase("index"):
+            usages = {
+                path.relative_to(root).as_posix(): [(full_id(key), line, text) for key, text, _, line in hits]
+                for path, hits in zip(cs_files, hits_per_file)
+                if hits
+            }
+            updated = store.sync_usages(usages)
+        if updated:
+            print(f"[OK] {'Would update' if args.check else 'Updated'} key usage index for {updated} .cs files.")
+
+        # Log keys present in JSON but not in code
+        missing_in_code = store.ids() - set(entries.keys())
+        if missing_in_code:
+            print(f"[INFO] {len(missing_in_code)} keys exist in JSON but not in code:")
+            for mid in sorted(missing_in_code):
+                print(f"       - {mid}")
+
+        # Log when EN value in JSON does not match code default
+        ids_to_default = {sid: entries[sid][0] for sid in ids_sorted}
+        for _id, json_en in store.en_defaults().items():
             if _id in ids_to_default:
                 code_default = ids_to_default[_id]
-                json_en = d["EN"]
                 if json_en != code_default:
                     print(f"[WARN] EN value for key '{_id}' in JSON does not match code default:")
                     print(f"       JSON:  '{json_en}'")
                     print(f"       Code:  '{code_default}'")
 
-    json_list = ensure_json_contains_all_keys(json_list, ids_to_default, locale_codes)
-    write_json(json_path, json_list)
-    print(f"[OK] Synced JSON: {json_path}")
+        with timings.phase("store"):
+            store.upsert_defaults(ids_to_default, locale_codes)
+            store.ensure_locales(locale_codes)
+
+        if store.dirty_json:
+            # strings.json keeps the platform line endings it always had (text-mode write)
+            with timings.phase("json"):
+                text = store.export_json()
+                changed = writer.write(json_path, text, newline=os.linesep)
+                store.set_meta("json_sha256", sha256(writer.encode(text, os.linesep)))
+        else:
+            writer.skip()
+            changed = False
+        synced = "Would sync" if args.check else "Synced"
+        print(f"[OK] {synced} JSON: {json_path}" if changed else f"[OK] JSON up to date: {json_path}")
+
+        # For each locale subfolder, write a ret_strings.xml and its string pack
+        # from the store; locales whose translations and files are unchanged are
+        # not re-rendered
+        before = len(writer.changed)
+        per_locale = 1 if args.check else 2
+        for code in locale_codes:
+            xml_path = loc_root / code / "ret_strings.xml"
+            pack_path = xml_path.with_suffix(PACK_SUFFIX)
+            xml_key, pack_key = f"xml_sha256:{code}", f"pack_sha256:{code}"
+            outputs = ((xml_path, xml_key), (pack_path, pack_key))[:per_locale]
+            if not store.dirty_locales and all(
+                (expected := store.get_meta(key)) is not None and file_sha256(path) == expected
+                for path, key in outputs
+            ):
+                writer.skip(per_locale)
+                continue
+            with timings.phase("locale", code):
+                strings = store.locale_strings(code)
+                text = render_strings_xml(code, strings)
+                writer.write(xml_path, text)
+                store.set_meta(xml_key, sha256(writer.encode(text)))
+                if not args.check:
+                    pack = build_pack(strings)
+                    writer.write_bytes(pack_path, pack)
+                    store.set_meta(pack_key, sha256(pack))
+
+        print(f"[OK] {verb} {len(writer.changed) - before} of {per_locale * len(locale_codes)} locale {'XML' if args.check else 'XML and pack'} files under {loc_root}")
+
+        if args.coverage:
+            print("[INFO] Translation coverage:")
+            for code, (done, total) in store.coverage(locale_codes).items():
+                pct = 100.0 * done / total if total else 100.0
+                print(f"       {code:<5} {done:>5}/{total:<5} {pct:6.1f}%")
+
+        # Round-trip every pack written now (memory-mapped read back, compared with
+        # the XML next to it); --check verifies every pack on disk instead
+        with timings.phase("verify"):
+            packs = sorted(loc_root.rglob(f"*{PACK_SUFFIX}")) if args.check else [
+                path for path in writer.changed if path.suffix == PACK_SUFFIX
+            ]
+            problems = [problem for pack_path in packs for problem in verify_pack(pack_path)]
+        if problems:
+            for problem in problems:
+                print(f"[ERROR] {problem}", file=sys.stderr)
+            # The store is not committed: the next run writes the packs again
+            return 1
+        if packs:
+            print(f"[OK] Verified {len(packs)} string packs against their XML.")
+
+        if not args.check:
+            with timings.phase("store"):
+                store.commit()
+    finally:
+        store.close()
+
+    # Summary
+    if not writer.changed:
+        print(f"[OK] All {writer.total} outputs up to date.")
+        return 0
+
+    print(f"[{'CHECK' if args.check else 'OK'}] {len(writer.changed)} of {writer.total} outputs {'would change' if args.check else 'changed'}:")
+    for path in writer.changed:
+        print(f"       - {path.relative_to(script_dir)}")
+    return 1 if args.check else 0
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                    index queries                       #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
 
-    # For each locale subfolder, write a ret_strings.xml from JSON values
-    i = 0
-    for code in locale_codes:
-        i += 1
-        write_locale_xml(loc_root / code, code, json_list)
 
-    print(f"[OK] Wrote {i} locale XML files under {loc_root}")
+def query(args) -> int:
+    """Answer a query command from the module's store (see parse_args())."""
+    script_dir = Path(__file__).resolve().parent
+    mod = args.module
+    store_path = script_dir / mod / STORE_NAME
+    if not store_path.exists():
+        print(f"[ERROR] No string index for {mod} yet; run strings.py --module {mod} first.", file=sys.stderr)
+        return 2
+
+    def location(file: str, line: int) -> str:
+        return f"src/{mod}/{file}:{line}"
+
+    store = StringStore(store_path)
+    try:
+        if not store.has_usages():
+            print(f"[WARN] The key usage index of {mod} is empty; run strings.py --module {mod} to fill it.", file=sys.stderr)
+        elif file_sha256(script_dir / mod / JSON_NAME) != store.get_meta("json_sha256"):
+            print(f"[WARN] {JSON_NAME} changed since the last sync; run strings.py to refresh the index.", file=sys.stderr)
+
+        if args.command == "where":
+            sid = full_id(args.key)
+            uses = store.usages(sid)
+            if not uses:
+                if sid in store.ids():
+                    print(f"[INFO] '{sid}' is in {JSON_NAME} but not used in code.")
+                    return 0
+                print(f"[ERROR] Unknown key '{sid}'", file=sys.stderr)
+                return 1
+            print(f"{sid}: {len(uses)} call{'s' if len(uses) != 1 else ''}")
+            for file, line, text in uses:
+                print(f"  {location(file, line)}  '{text}'")
+
+        elif args.command == "orphans":
+            orphans = store.orphans()
+            print(f"[INFO] {len(orphans)} keys exist in JSON but not in code" + (":" if orphans else "."))
+            for sid in orphans:
+                print(f"       - {sid}")
+
+        elif args.command == "conflicts":
+            conflicts = store.conflicts()
+            print(f"[INFO] {len(conflicts)} keys have differing fallbacks" + (":" if conflicts else "."))
+            for sid, uses in conflicts.items():
+                print(f"  {sid}")
+                for file, line, text in uses:
+                    print(f"    {location(file, line)}  '{text}'")
+
+        elif args.command == "untranslated":
+            locale_codes = list_locale_codes(script_dir / mod / LOCS_DIRNAME)
+            if args.locale not in locale_codes:
+                print(f"[ERROR] Unknown locale '{args.locale}' (known: {', '.join(locale_codes)})", file=sys.stderr)
+                return 2
+            missing = store.untranslated(args.locale)
+            print(f"[INFO] {len(missing)} keys used in code have no {args.locale} translation" + (":" if missing else "."))
+            for sid, en in missing:
+                print(f"       - {sid}  '{en}'")
+    finally:
+        store.close()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
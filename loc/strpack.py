@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+"""
+Compact, pre-indexed string packs generated next to each ret_strings.xml.
+
+A pack holds the same (id, text) pairs as the XML string table, as the game
+sees them after parsing, laid out so a loader can memory-map the file and
+binary-search ids instead of parsing XML. All integers are little-endian.
+
+  header (48 bytes)
+    magic     4s   b"RSPK"
+    version   u16  PACK_VERSION
+    reserved  u16  0
+    count     u32  number of strings
+    blob_size u32  size of the UTF-8 blob
+    sha256    32s  hash of everything after the header (table + blob)
+  table (count * 16 bytes), sorted by the UTF-8 bytes of the id
+    id_off u32, id_len u32, text_off u32, text_len u32   (offsets into the blob)
+  blob (blob_size bytes)
+    UTF-8 ids and texts
+
+Usage:
+  python strpack.py verify <Languages dir | ret_strings.pack ...>
+  python strpack.py get <ret_strings.pack> <id>
+  python strpack.py dump <ret_strings.pack>
+"""
+
+import sys
+import mmap
+import struct
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+
+from pathlib import Path
+
+PACK_SUFFIX = ".pack"
+PACK_MAGIC = b"RSPK"
+PACK_VERSION = 1
+
+HEADER = struct.Struct("<4sHHII32s")
+ENTRY = struct.Struct("<IIII")
+
+
+class PackError(ValueError):
+    """The file is not a valid string pack."""
+
+
+def game_text(text: str) -> str:
+    """
+    Return text as the game reads it back from ret_strings.xml: newlines become
+    {newline} (see strings.xml_escape) and the XML parser turns tabs into spaces.
+    """
+    text = text.replace("\\n", "{newline}")
+    text = text.replace("\r\n", "{newline}").replace("\r", "{newline}").replace("\n", "{newline}")
+    return text.replace("\t", " ")
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                         writer                         #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def build_pack(strings) -> bytes:
+    """
+    Build a pack from (id, text) pairs, taken as written to ret_strings.xml.
+    Ids must be unique.
+    """
+    items = sorted((game_text(sid).encode("utf-8"), game_text(txt).encode("utf-8")) for sid, txt in strings)
+
+    table = bytearray()
+    blob = bytearray()
+    previous = None
+    for sid, txt in items:
+        if sid == previous:
+            raise PackError(f"duplicate id: {sid.decode('utf-8')}")
+        previous = sid
+        id_off = len(blob)
+        blob += sid
+        text_off = len(blob)
+        blob += txt
+        table += ENTRY.pack(id_off, len(sid), text_off, len(txt))
+
+    body = bytes(table) + bytes(blob)
+    header = HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(items), len(blob), hashlib.sha256(body).digest())
+    return header + body
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                    reference reader                    #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+class StringPack:
+    """
+    Read-only view of a pack: the file is memory-mapped and lookups binary-search
+    the id table, so opening costs nothing but the header check.
+
+        with StringPack.open(path) as pack:
+            pack.get("ret_some_key")
+    """
+
+    def __init__(self, data, verify: bool = False):
+        self._data = data
+        if len(data) < HEADER.size:
+            raise PackError("file too small for a pack header")
+        magic, version, _, count, blob_size, digest = HEADER.unpack_from(data, 0)
+        if magic != PACK_MAGIC:
+            raise PackError("bad magic")
+        if version != PACK_VERSION:
+            raise PackError(f"unsupported pack version {version}")
+        self._count = count
+        self._table = HEADER.size
+        self._blob = HEADER.size + count * ENTRY.size
+        if self._blob + blob_size != len(data):
+            raise PackError("size does not match header")
+        self.digest = digest
+        if verify and hashlib.sha256(data[HEADER.size :]).digest() != digest:
+            raise PackError("content hash mismatch")
+
+    @classmethod
+    def open(cls, path: Path, verify: bool = False) -> "StringPack":
+        with open(path, "rb") as f:
+            if Path(path).stat().st_size == 0:
+                raise PackError("empty file")
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data, verify=verify)
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, i: int) -> tuple[int, int, int, int]:
+        return ENTRY.unpack_from(self._data, self._table + i * ENTRY.size)
+
+    def _id_bytes(self, i: int) -> bytes:
+        id_off, id_len, _, _ = self._entry(i)
+        start = self._blob + id_off
+        return self._data[start : start + id_len]
+
+    def _text(self, i: int) -> str:
+        _, _, text_off, text_len = self._entry(i)
+        start = self._blob + text_off
+        return self._data[start : start + text_len].decode("utf-8")
+
+    def get(self, sid: str, default: str | None = None) -> str | None:
+        key = sid.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self._id_bytes(mid)
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return self._text(mid)
+        return default
+
+    def __contains__(self, sid: str) -> bool:
+        return self.get(sid) is not None
+
+    def items(self):
+        """Yield (id, text) pairs in table (byte-sorted id) order."""
+        for i in range(self._count):
+            yield self._id_bytes(i).decode("utf-8"), self._text(i)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                    round-trip checks                   #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def read_xml_strings(xml_path: Path) -> dict[str, str]:
+    """{id: text} of a ret_strings.xml, as an XML parser (and the game) reads it."""
+    root = ET.parse(xml_path).getroot()
+    return {el.get("id"): el.get("text") for el in root.iter("string")}
+
+
+def verify_pack(pack_path: Path) -> list[str]:
+    """Compare a pack with the ret_strings.xml next to it; return the problems found."""
+    xml_path = pack_path.with_suffix(".xml")
+    if not xml_path.exists():
+        return [f"{pack_path}: no {xml_path.name} next to it"]
+    expected = read_xml_strings(xml_path)
+    try:
+        with StringPack.open(pack_path, verify=True) as pack:
+            problems = []
+            actual = dict(pack.items())
+            for sid, text in expected.items():
+                if pack.get(sid) != text:
+                    problems.append(f"{pack_path}: '{sid}' is {pack.get(sid)!r}, XML has {text!r}")
+            for sid in actual.keys() - expected.keys():
+                problems.append(f"{pack_path}: '{sid}' is not in {xml_path.name}")
+            if len(pack) != len(expected):
+                problems.append(f"{pack_path}: {len(pack)} strings, XML has {len(expected)}")
+            return problems
+    except PackError as e:
+        return [f"{pack_path}: {e}"]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Inspect and verify ret_strings string packs")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p_verify = sub.add_parser("verify", help="round-trip packs against the ret_strings.xml next to them")
+    p_verify.add_argument("paths", nargs="+", type=Path, help="pack files, or directories searched recursively")
+    p_get = sub.add_parser("get", help="look up one id")
+    p_get.add_argument("pack", type=Path)
+    p_get.add_argument("id")
+    p_dump = sub.add_parser("dump", help="print every (id, text) pair")
+    p_dump.add_argument("pack", type=Path)
+    args = ap.parse_args(argv)
+
+    if args.command == "get":
+        with StringPack.open(args.pack) as pack:
+            text = pack.get(args.id)
+        if text is None:
+            print(f"[ERROR] '{args.id}' not found", file=sys.stderr)
+            return 1
+        print(text)
+        return 0
+
+    if args.command == "dump":
+        with StringPack.open(args.pack) as pack:
+            for sid, text in pack.items():
+                print(f"{sid}\t{text}")
+        return 0
+
+    packs = []
+    for path in args.paths:
+        packs.extend(sorted(path.rglob(f"*{PACK_SUFFIX}")) if path.is_dir() else [path])
+    problems = [problem for pack_path in packs for problem in verify_pack(pack_path)]
+    for problem in problems:
+        print(f"[ERROR] {problem}", file=sys.stderr)
+    print(f"[OK] Verified {len(packs)} packs" if not problems else f"[ERROR] {len(problems)} problems in {len(packs)} packs")
+    return 1 if problems or not packs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,12 @@
 using Bannerlord.UIExtenderEx.Attributes;
 using Bannerlord.UIExtenderEx.Prefabs2;
-using Retinues.Utils;
+using Retinues.GUI.Helpers;
 
 [PrefabExtension("ClanScreen", "descendant::ClanScreenWidget/Children")]
 internal sealed class ClanScreen_TopPanel_Insert : PrefabExtensionInsertPatch
 {
     [PrefabExtensionFileName]
-    public string FileName =>
-        BannerlordVersion.IsAtLeast14() ? "ClanScreen_TopPanel_BL14" : "ClanScreen_TopPanel";
+    public string FileName => PrefabVariants.ForCurrentVersion("ClanScreen_TopPanel");
 
     public override InsertType Type => InsertType.Child;
 
@@ -1,6 +1,6 @@
 using Bannerlord.UIExtenderEx.Attributes;
 using Bannerlord.UIExtenderEx.Prefabs2;
-using Retinues.Utils;
+using Retinues.GUI.Helpers;
 
 [PrefabExtension(
     "ClanScreen",
@@ -9,8 +9,7 @@ using Retinues.Utils;
 internal class ClanScreen_TroopsPanel : PrefabExtensionInsertPatch
 {
     [PrefabExtensionFileName]
-    public string FileName =>
-        BannerlordVersion.IsAtLeast14() ? "ClanScreen_TroopsPanel_BL14" : "ClanScreen_TroopsPanel";
+    public string FileName => PrefabVariants.ForCurrentVersion("ClanScreen_TroopsPanel");
 
     public override InsertType Type => InsertType.Child;
 
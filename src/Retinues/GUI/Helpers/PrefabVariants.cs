@@ -0,0 +1,81 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+using Retinues.Utils;
+using TaleWorlds.ModuleManager;
+
+namespace Retinues.GUI.Helpers
+{
+    /// <summary>
+    /// Resolves the file name of a generated prefab for the running game version.
+    /// The prefab renderer only ships a "_BL14" variant when it differs from the
+    /// base prefab, and lists the shipped variants in GUI/prefab_variants.txt.
+    /// </summary>
+    public static class PrefabVariants
+    {
+        private const string ListFileName = "prefab_variants.txt";
+        private const string BL14Suffix = "_BL14";
+
+        private static HashSet<string> _variants;
+        private static bool _loaded;
+
+        /// <summary>
+        /// Returns the "_BL14" variant of a prefab on BL 1.4+ when one was shipped,
+        /// otherwise the base prefab name.
+        /// </summary>
+        public static string ForCurrentVersion(string name)
+        {
+            if (!BannerlordVersion.IsAtLeast14())
+                return name;
+
+            var variant = name + BL14Suffix;
+            return HasVariant(variant) ? variant : name;
+        }
+
+        /// <summary>
+        /// True if the variant was shipped. Without a readable list (builds that
+        /// predate it), every variant is assumed to exist, as they all used to.
+        /// </summary>
+        private static bool HasVariant(string variant)
+        {
+            if (!_loaded)
+            {
+                _variants = Load();
+                _loaded = true;
+            }
+            return _variants == null || _variants.Contains(variant);
+        }
+
+        private static HashSet<string> Load()
+        {
+            try
+            {
+                var path = Path.Combine(
+                    ModuleHelper.GetModuleFullPath("Retinues"),
+                    "GUI",
+                    ListFileName
+                );
+                if (!File.Exists(path))
+                {
+                    Log.Warn($"{ListFileName} not found; assuming every prefab has a variant.");
+                    return null;
+                }
+
+                var variants = new HashSet<string>(StringComparer.OrdinalIgnoreCase);
+                foreach (var raw in File.ReadAllLines(path))
+                {
+                    var line = raw.Trim();
+                    if (line.Length == 0 || line.StartsWith("#"))
+                        continue;
+                    variants.Add(line);
+                }
+                return variants;
+            }
+            catch (Exception ex)
+            {
+                Log.Exception(ex, $"Failed to read {ListFileName}");
+                return null;
+            }
+        }
+    }
+}
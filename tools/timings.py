@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+Per-phase timing reports shared by the build scripts (loc/strings.py --timings,
+tpl/render_prefabs.py --timings), and the summary build.py prints at the end.
+
+A report is a JSON file:
+  {"format": 1, "tool": "strings", "total_s": 1.23, "peak_bytes": 456,
+   "phases": [{"phase": "scan", "item": null, "seconds": 0.5, "peak_bytes": 123}, ...]}
+
+"item" distinguishes repeated phases (one "locale" phase per locale, one
+"render" phase per prefab, ...). Memory is the peak of Python allocations traced
+by tracemalloc during the phase (None when not tracing); tracing slows the run
+down, so compare wall times of runs recorded with the same options only.
+
+Usage:
+  python tools/timings.py summary REPORT.json [REPORT.json ...] [--step NAME=SECONDS ...]
+"""
+
+import sys
+import json
+import time
+import argparse
+
+from pathlib import Path
+from contextlib import contextmanager
+
+REPORT_FORMAT = 1
+
+# Open phases of every Timings instance in this process, innermost last: tracemalloc
+# has a single peak counter, so nested phases hand their peak up to the enclosing one
+_open_peaks: list[list[int]] = []
+
+
+def _tracemalloc():
+    """
+    The tracemalloc module if allocations are being traced, else None. Tracing is
+    always started through tracemalloc.start(), which imports it: runs that don't
+    trace never pay for the import.
+    """
+    module = sys.modules.get("tracemalloc")
+    return module if module is not None and module.is_tracing() else None
+
+
+class Timings:
+    """
+    Records (phase, item, seconds, peak_bytes) entries. A disabled instance
+    records nothing, so call sites can time unconditionally.
+    """
+
+    def __init__(self, tool: str, enabled: bool = True, trace_memory: bool = False):
+        self.tool = tool
+        self.enabled = enabled
+        self.phases: list[dict] = []
+        self.started = time.perf_counter()
+        if enabled and trace_memory and _tracemalloc() is None:
+            import tracemalloc
+
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str, item: str | None = None):
+        if not self.enabled:
+            yield
+            return
+
+        tracemalloc = _tracemalloc()
+        tracing = tracemalloc is not None
+        if tracing:
+            if _open_peaks:
+                _open_peaks[-1][0] = max(_open_peaks[-1][0], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            _open_peaks.append([0])
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            peak = None
+            if tracing:
+                peak = max(_open_peaks.pop()[0], tracemalloc.get_traced_memory()[1])
+                if _open_peaks:
+                    _open_peaks[-1][0] = max(_open_peaks[-1][0], peak)
+            self.add(name, seconds, peak, item)
+
+    def add(self, name: str, seconds: float, peak_bytes: int | None = None, item: str | None = None):
+        """Record a phase measured elsewhere (e.g. in a worker process)."""
+        if self.enabled:
+            self.phases.append({"phase": name, "item": item, "seconds": seconds, "peak_bytes": peak_bytes})
+
+    def extend(self, phases: list[dict]):
+        if self.enabled:
+            self.phases.extend(phases)
+
+    def report(self) -> dict:
+        peaks = [p["peak_bytes"] for p in self.phases if p["peak_bytes"] is not None]
+        return {
+            "format": REPORT_FORMAT,
+            "tool": self.tool,
+            "total_s": time.perf_counter() - self.started,
+            "peak_bytes": max(peaks) if peaks else None,
+            "phases": self.phases,
+        }
+
+    def write(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2) + "\n", encoding="utf-8")
+        print(f"[OK] Timings written to {path}")
+
+
+@contextmanager
+def profiled(path: Path | None):
+    """Run the block under cProfile and dump its stats to path (no-op when path is None)."""
+    if path is None:
+        yield
+        return
+
+    import pstats
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
+        print(f"[OK] Profile written to {path} (inspect with: python -m pstats {path})")
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(15)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                        summary                         #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def format_bytes(n: int | None) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def summarize(reports: list[dict], steps: list[tuple[str, float]] = ()) -> str:
+    """
+    One build-time breakdown: each tool's total, then its phases grouped by
+    name (repeated phases are summed, with their count and slowest item).
+    """
+    lines = []
+    for name, seconds in steps:
+        lines.append(f"  {name:<28} {seconds:>9.2f}s")
+
+    for report in reports:
+        lines.append(f"  {report['tool']:<28} {report['total_s']:>9.2f}s  peak {format_bytes(report.get('peak_bytes'))}")
+        groups: dict[str, list[dict]] = {}
+        for p in report["phases"]:
+            groups.setdefault(p["phase"], []).append(p)
+        for phase, entries in groups.items():
+            seconds = sum(p["seconds"] for p in entries)
+            peaks = [p["peak_bytes"] for p in entries if p["peak_bytes"] is not None]
+            line = f"    {phase:<26} {seconds:>9.3f}s  peak {format_bytes(max(peaks) if peaks else None):>7}"
+            if len(entries) > 1:
+                line += f"  x{len(entries)}"
+                slowest = max(entries, key=lambda p: p["seconds"])
+                if slowest["item"] is not None:
+                    line += f", slowest {slowest['item']} ({slowest['seconds']:.3f}s)"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def parse_step(value: str) -> tuple[str, float]:
+    name, sep, seconds = value.rpartition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NAME=SECONDS, got '{value}'")
+    return name, float(seconds)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Aggregate build timing reports")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p_summary = sub.add_parser("summary", help="print one breakdown for several reports")
+    p_summary.add_argument("reports", nargs="*", type=Path, help="timing reports written with --timings")
+    p_summary.add_argument("--step", action="append", type=parse_step, default=[], help="extra NAME=SECONDS line (e.g. a dotnet build)")
+    args = ap.parse_args()
+
+    reports = []
+    for path in args.reports:
+        try:
+            reports.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Skipping timing report {path}: {e}", file=sys.stderr)
+    print(summarize(reports, args.step))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
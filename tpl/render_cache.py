@@ -0,0 +1,349 @@
+"""
+Content-addressed cache of rendered prefabs, shared by every checkout.
+
+The build manifest (tpl/.cache/<Module>.manifest.json) only knows what is on
+disk in this working tree: after a branch switch every changed template is
+rendered again, even when the same sources were rendered minutes earlier.
+This cache lives outside the repository (~/.cache/retinues/prefabs by default)
+and maps a render key (render_prefabs.render_key(): the template with its
+resolved includes and macros, the render globals, the suffix, the output form
+and the renderer itself) to the bytes that were written. A rendered file is
+stored once per content hash, however many keys produce it. The templates
+each template references are kept too, by template hash, so a checkout whose
+outputs are all cached needs neither Jinja nor a single template parse.
+
+Layout:
+- index.db: SQLite index of keys, blobs, template references, last use and
+  hit/miss counters
+- objects/<2 hex>/<sha256>: the rendered files
+
+The cache is bounded by size: once over its limit, the least recently used
+keys are evicted, and blobs no key references any more are deleted.
+A lost or damaged object is a cache miss, and a failed store only warns.
+Each lookup and store is its own short transaction, so concurrent builds
+(other checkouts, parallel stages) share the index. When the index stays
+locked or unreadable past a short busy timeout, the cache warns once and is
+bypassed for the rest of the run: the render goes on without it.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+
+from contextlib import contextmanager
+
+from pathlib import Path
+
+# Bump when the layout changes; an older index is dropped with its objects
+CACHE_FORMAT = 1
+
+# Default location and size limit, overridable by environment
+DEFAULT_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "retinues" / "prefabs"
+DEFAULT_MAX_MB = 100
+
+# Seconds to wait for another process' write to the index before giving up on the cache
+BUSY_TIMEOUT = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,  -- render_prefabs.render_key()
+    blob        TEXT NOT NULL,     -- sha256 of the rendered bytes
+    pretty_size INTEGER NOT NULL,  -- size of the pretty form (minify size reports)
+    last_used   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scans (
+    hash      TEXT PRIMARY KEY,  -- sha256 of a template source
+    refs      TEXT NOT NULL,     -- JSON list of the templates it includes/imports/extends
+    dynamic   INTEGER NOT NULL,  -- 1 when it references a template by expression
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    name  TEXT PRIMARY KEY,  -- hits, misses, stores, evictions
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used);
+CREATE INDEX IF NOT EXISTS entries_blob ON entries (blob);
+CREATE INDEX IF NOT EXISTS scans_lru ON scans (last_used);
+"""
+
+
+def cache_dir() -> Path:
+    """The cache location: $RETINUES_PREFAB_CACHE, or DEFAULT_DIR."""
+    return Path(os.environ.get("RETINUES_PREFAB_CACHE") or DEFAULT_DIR)
+
+
+def cache_max_bytes() -> int:
+    """The size limit: $RETINUES_PREFAB_CACHE_MB megabytes, or DEFAULT_MAX_MB."""
+    try:
+        return int(float(os.environ.get("RETINUES_PREFAB_CACHE_MB") or DEFAULT_MAX_MB) * 2**20)
+    except ValueError:
+        return DEFAULT_MAX_MB * 2**20
+
+
+class RenderCache:
+    """
+    Render key -> rendered bytes, with LRU eviction.
+    The index is opened on first use (a run with nothing to render never pays
+    for it) in autocommit mode: every lookup and store commits on its own.
+    close() evicts down to the size limit and records this run's counters.
+    """
+
+    def __init__(self, root: Path | None = None, max_bytes: int | None = None):
+        self.root = root or cache_dir()
+        self.max_bytes = cache_max_bytes() if max_bytes is None else max_bytes
+        self._db = None
+        self._bypassed = False
+        self._counts = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = self._open()
+        return self._db
+
+    def _connect(self, path: Path):
+        import sqlite3
+
+        db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        # WAL: lookups from other builds don't wait for a writer, and the many
+        # small commits of a run don't each sync the disk
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _open(self):
+        import sqlite3
+
+        path = self.root / "index.db"
+        self.root.mkdir(parents=True, exist_ok=True)
+        db = None
+        try:
+            db = self._connect(path)
+            db.executescript(SCHEMA)
+            row = db.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+            if row is not None and row[0] == str(CACHE_FORMAT):
+                return db
+        except sqlite3.OperationalError:
+            # Locked by another build (or unwritable): not a reason to drop the index
+            if db is not None:
+                db.close()
+            raise
+        except sqlite3.DatabaseError:
+            pass
+        if db is not None:
+            db.close()
+
+        # Missing, outdated or corrupted: start over (the objects go with the index)
+        import shutil
+
+        for stale in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+            stale.unlink(missing_ok=True)
+        shutil.rmtree(self.root / "objects", ignore_errors=True)
+        db = self._connect(path)
+        db.executescript(SCHEMA)
+        db.execute("INSERT INTO meta (key, value) VALUES ('format', ?)", (str(CACHE_FORMAT),))
+        return db
+
+    def _safely(self, action, default=None):
+        """
+        Run action(db) against the index. On a SQLite error (e.g. the index is
+        locked by another build), warn once and bypass the cache until close().
+        """
+        if self._bypassed:
+            return default
+        import sqlite3
+
+        try:
+            return action(self.db)
+        except sqlite3.Error as e:
+            print(f"[WARN] Prefab render cache unavailable ({e}); continuing without it", file=sys.stderr)
+            self._bypassed = True
+            return default
+
+    @staticmethod
+    @contextmanager
+    def _transaction(db):
+        """One short write transaction (the index is otherwise in autocommit mode)."""
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+
+    def _object(self, blob: str) -> Path:
+        return self.root / "objects" / blob[:2] / blob
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    #                     lookup and store                   #
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+    def get(self, key: str) -> tuple[bytes, int] | None:
+        """Return (rendered bytes, pretty size) for key, or None on a miss."""
+        hit = self._safely(lambda db: self._lookup(db, key))
+        self._counts["hits" if hit is not None else "misses"] += 1
+        return hit
+
+    def _lookup(self, db, key: str) -> tuple[bytes, int] | None:
+        row = db.execute("SELECT blob, pretty_size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data = None
+        try:
+            data = self._object(row[0]).read_bytes()
+        except OSError:
+            pass
+        if data is not None and hashlib.sha256(data).hexdigest() != row[0]:
+            self._object(row[0]).unlink(missing_ok=True)
+            data = None
+        if data is None:
+            # Object lost or damaged: forget the key, the caller renders (and stores) it again
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return data, row[1]
+
+    def put(self, key: str, data: bytes, pretty_size: int | None = None) -> None:
+        """Store the rendered bytes of key (pretty_size defaults to their size)."""
+        if self._bypassed:
+            return
+        blob = hashlib.sha256(data).hexdigest()
+        path = self._object(blob)
+        try:
+            if not path.is_file():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f".{blob}.{os.getpid()}.tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+        except OSError as e:
+            print(f"[WARN] Could not store {key[:12]} in the prefab cache: {e}", file=sys.stderr)
+            return
+
+        def record(db) -> bool:
+            with self._transaction(db):
+                db.execute(
+                    "INSERT INTO blobs (hash, size) VALUES (?, ?) ON CONFLICT (hash) DO NOTHING",
+                    (blob, len(data)),
+                )
+                db.execute(
+                    "INSERT INTO entries (key, blob, pretty_size, last_used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET blob = excluded.blob, pretty_size = excluded.pretty_size, "
+                    "last_used = excluded.last_used",
+                    (key, blob, len(data) if pretty_size is None else pretty_size, time.time()),
+                )
+            return True
+
+        if self._safely(record, False):
+            self._counts["stores"] += 1
+
+    def get_scan(self, template_hash: str) -> dict | None:
+        """Return {"refs", "dynamic"} recorded for a template source, or None."""
+
+        def lookup(db) -> dict | None:
+            row = db.execute("SELECT refs, dynamic FROM scans WHERE hash = ?", (template_hash,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE scans SET last_used = ? WHERE hash = ?", (time.time(), template_hash))
+            return {"refs": json.loads(row[0]), "dynamic": bool(row[1])}
+
+        return self._safely(lookup)
+
+    def put_scan(self, template_hash: str, refs: list[str], dynamic: bool) -> None:
+        self._safely(
+            lambda db: db.execute(
+                "INSERT INTO scans (hash, refs, dynamic, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET last_used = excluded.last_used",
+                (template_hash, json.dumps(refs), int(dynamic), time.time()),
+            )
+        )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    #                   eviction and stats                   #
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+    @staticmethod
+    def _size(db) -> int:
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop least recently used keys until the objects fit max_bytes; return how many."""
+        evicted = self._safely(self._evict, 0)
+        self._counts["evictions"] += evicted
+        return evicted
+
+    def _evict(self, db) -> int:
+        if self._size(db) <= self.max_bytes:
+            return 0
+        evicted = 0
+        with self._transaction(db):
+            total = self._size(db)
+            lru = db.execute("SELECT key, blob FROM entries ORDER BY last_used").fetchall()
+            for key, blob in lru:
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                evicted += 1
+                if db.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (blob,)).fetchone():
+                    continue  # still produced by another key
+                row = db.execute("SELECT size FROM blobs WHERE hash = ?", (blob,)).fetchone()
+                db.execute("DELETE FROM blobs WHERE hash = ?", (blob,))
+                self._object(blob).unlink(missing_ok=True)
+                total -= row[0] if row else 0
+            # Template scans are tiny: keep those used since the oldest remaining key
+            db.execute("DELETE FROM scans WHERE last_used < (SELECT MIN(last_used) FROM entries)")
+        return evicted
+
+    def stats(self) -> dict | None:
+        """Counters since the cache was created plus its current content, or None when unavailable."""
+
+        def read(db) -> dict:
+            counts = dict(db.execute("SELECT name, value FROM stats").fetchall())
+            for name, value in self._counts.items():
+                counts[name] = counts.get(name, 0) + value
+            lookups = counts["hits"] + counts["misses"]
+            entries, oldest = db.execute("SELECT COUNT(*), MIN(last_used) FROM entries").fetchone()
+            return {
+                **counts,
+                "hit_rate": counts["hits"] / lookups if lookups else None,
+                "entries": entries,
+                "blobs": db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0],
+                "size": self._size(db),
+                "max_size": self.max_bytes,
+                "oldest_use": oldest,
+            }
+
+        return self._safely(read)
+
+    def close(self) -> None:
+        """Evict down to the size limit, record this run's counters and close the index."""
+        if self._db is not None:
+            self.evict()
+
+            def record(db):
+                with self._transaction(db):
+                    for name, value in self._counts.items():
+                        if value:
+                            db.execute(
+                                "INSERT INTO stats (name, value) VALUES (?, ?) "
+                                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                                (name, value),
+                            )
+
+            if any(self._counts.values()):
+                self._safely(record)
+            self._db.close()
+            self._db = None
+        self._counts = dict.fromkeys(self._counts, 0)
+        self._bypassed = False
@@ -1,9 +1,22 @@
+import os
 import sys
-import xml.dom.minidom
+import json
+import time
+import shutil
+import hashlib
 import argparse
 
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, TemplateError, ChoiceLoader
+from xml.parsers import expat
+from collections import namedtuple
+from contextlib import nullcontext
+
+# jinja2, the process pool, tempfile and tracemalloc are imported where first
+# needed: a run where every output is up to date never parses or renders a
+# template, and should cost little more than starting Python (bench/startup.py)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+from timings import Timings, profiled  # noqa: E402
 
 # Directory containing this script (expected: .../tpl)
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -11,112 +24,546 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 # Output base is ../gui relative to tpl directory -> .../gui
 OUTPUT_BASE = SCRIPT_DIR.parent / "gui"
 
+# Compiled template (bytecode) cache, reused across runs -> .../tpl/.cache/jinja
+BYTECODE_CACHE_DIR = SCRIPT_DIR / ".cache" / "jinja"
+
+# Incremental build manifests, one per module -> .../tpl/.cache/<Module>.manifest.json
+MANIFEST_DIR = SCRIPT_DIR / ".cache"
+
+# Bump when the manifest layout changes; older manifests trigger a clean rebuild
+MANIFEST_FORMAT = 1
+
+# Written to gui/<Module>/: the suffixed variants (e.g. "ClanScreen_TopPanel_BL14")
+# that differ from their base prefab. Identical variants are not written; the
+# game side loads the base prefab instead (see GUI/Helpers/PrefabVariants.cs)
+VARIANTS_NAME = "prefab_variants.txt"
+
+# Hash of this script: any renderer change invalidates previously rendered outputs
+RENDERER_HASH = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+class PrettyXmlError(ValueError):
+    """Rendered output is not well-formed XML."""
+
+    def __init__(self, name: str | None, line: int, column: int, reason: str):
+        self.name = name
+        self.line = line
+        self.column = column
+        self.reason = reason
+        super().__init__(f"Malformed XML in {name or '<string>'} at line {line}, column {column}: {reason}")
+
+
+def _escape_xml(data: str) -> str:
+    return data.replace("&", "&amp;").replace("<", "&lt;").replace('"', "&quot;").replace(">", "&gt;")
+
+
+def _escape_attr(data: str) -> str:
+    return _escape_xml(data).replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#9;")
+
+
+class _PrettyWriter:
+    """
+    Expat event handlers writing the same layout as minidom's toprettyxml():
+    one node per line, elements without children self-closed, elements whose
+    only child is text kept on one line, other text on its own indented line.
+    Open elements are the only state kept, so memory does not grow with the tree.
+    """
+
+    def __init__(self, indent: str):
+        self.indent = indent
+        self.out = ['<?xml version="1.0" ?>\n']
+        # open elements: [tag, start tag still unclosed (no ">" yet), has written children,
+        #                 pending text/CDATA nodes as [is_cdata, data]]
+        self.stack = []
+        self.in_cdata = False
+        self.new_cdata = False
+
+    def _write_nodes(self, nodes: list, indent: str) -> None:
+        for is_cdata, data in nodes:
+            if is_cdata:
+                self.out.append(f"<![CDATA[{data}]]>")
+            else:
+                self.out.append(indent + _escape_xml(data) + "\n")
+
+    def _before_child(self) -> str:
+        """Close the parent's start tag and flush its pending text; return the child indent."""
+        if not self.stack:
+            return ""
+        frame = self.stack[-1]
+        child_indent = self.indent * len(self.stack)
+        if frame[1]:
+            self.out.append(">\n")
+            frame[1] = False
+        if frame[3]:
+            self._write_nodes(frame[3], child_indent)
+            frame[3] = []
+        frame[2] = True
+        return child_indent
+
+    def start(self, tag: str, attrs: list) -> None:
+        out = self.out
+        out.append(self._before_child() + "<" + tag)
+        for i in range(0, len(attrs), 2):
+            out.append(f' {attrs[i]}="{_escape_attr(attrs[i + 1])}"')
+        self.stack.append([tag, True, False, []])
+
+    def end(self, tag: str) -> None:
+        _, _, has_children, nodes = self.stack.pop()
+        if not has_children:
+            if not nodes:
+                self.out.append("/>\n")
+                return
+            if len(nodes) == 1:
+                # Sole text child: kept inline, without indentation
+                is_cdata, data = nodes[0]
+                inline = f"<![CDATA[{data}]]>" if is_cdata else _escape_xml(data)
+                self.out.append(f">{inline}</{tag}>\n")
+                return
+            self.out.append(">\n")
+        indent = self.indent * len(self.stack)
+        self._write_nodes(nodes, indent + self.indent)
+        self.out.append(f"{indent}</{tag}>\n")
+
+    def text(self, data: str) -> None:
+        if not self.stack:
+            return
+        nodes = self.stack[-1][3]
+        if self.in_cdata:
+            if self.new_cdata or not nodes or not nodes[-1][0]:
+                nodes.append([True, data])
+                self.new_cdata = False
+            else:
+                nodes[-1][1] += data
+        elif nodes and not nodes[-1][0]:
+            nodes[-1][1] += data
+        else:
+            nodes.append([False, data])
+
+    def start_cdata(self) -> None:
+        self.in_cdata = True
+        self.new_cdata = True
 
-def pretty_xml(raw: str, indent: str = "  ") -> str:
+    def end_cdata(self) -> None:
+        self.in_cdata = False
+
+    def comment(self, data: str) -> None:
+        self.out.append(f"{self._before_child()}<!--{data}-->\n")
+
+    def instruction(self, target: str, data: str) -> None:
+        self.out.append(f"{self._before_child()}<?{target} {data}?>\n")
+
+
+def pretty_xml(raw: str, indent: str = "  ", name: str | None = None) -> str:
     """
     Return pretty-printed XML text with consistent indentation.
-    Falls back to the raw string if parsing fails (e.g. incomplete XML snippet).
+    Formatting is driven by expat events instead of a DOM, so no tree is built.
+    Raises PrettyXmlError (with name and line) if raw is not well-formed XML.
     """
+    writer = _PrettyWriter(indent)
+    _parse(
+        raw,
+        name,
+        StartElementHandler=writer.start,
+        EndElementHandler=writer.end,
+        CharacterDataHandler=writer.text,
+        StartCdataSectionHandler=writer.start_cdata,
+        EndCdataSectionHandler=writer.end_cdata,
+        CommentHandler=writer.comment,
+        ProcessingInstructionHandler=writer.instruction,
+    )
+
+    # remove blank lines (whitespace-only text nodes)
+    return "\n".join(line for line in "".join(writer.out).splitlines() if line.strip())
+
+
+class _MinifyWriter:
+    """
+    Expat event handlers writing the compact form of a prefab: no comments, no
+    whitespace-only text (indentation), no line breaks between nodes. Elements,
+    attributes (in order), text, CDATA and processing instructions are kept as
+    they are; elements left without content are self-closed.
+    """
+
+    def __init__(self):
+        self.out = ['<?xml version="1.0" ?>']
+        self.open_tag = False  # the last start tag still lacks its ">"
+        self.runs = []  # pending character data of the current element: [is_cdata, data]
+        self.in_cdata = False
+
+    def _close_start(self) -> None:
+        if self.open_tag:
+            self.out.append(">")
+            self.open_tag = False
+
+    def _flush_text(self) -> None:
+        runs, self.runs = self.runs, []
+        if not any(is_cdata or data.strip() for is_cdata, data in runs):
+            return
+        self._close_start()
+        for is_cdata, data in runs:
+            self.out.append(f"<![CDATA[{data}]]>" if is_cdata else _escape_xml(data))
+
+    def start(self, tag: str, attrs: list) -> None:
+        self._flush_text()
+        self._close_start()
+        out = self.out
+        out.append("<" + tag)
+        for i in range(0, len(attrs), 2):
+            out.append(f' {attrs[i]}="{_escape_attr(attrs[i + 1])}"')
+        self.open_tag = True
+
+    def end(self, tag: str) -> None:
+        self._flush_text()
+        if self.open_tag:
+            self.out.append("/>")
+            self.open_tag = False
+        else:
+            self.out.append(f"</{tag}>")
+
+    def text(self, data: str) -> None:
+        if self.runs and self.runs[-1][0] == self.in_cdata:
+            self.runs[-1][1] += data
+        else:
+            self.runs.append([self.in_cdata, data])
+
+    def start_cdata(self) -> None:
+        self.in_cdata = True
+        self.runs.append([True, ""])
+
+    def end_cdata(self) -> None:
+        self.in_cdata = False
+
+    def instruction(self, target: str, data: str) -> None:
+        self._flush_text()
+        self._close_start()
+        self.out.append(f"<?{target} {data}?>")
+
+
+def _parse(raw: str, name: str | None, **handlers) -> None:
+    """Run raw through expat with the given handlers; raise PrettyXmlError if malformed."""
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.ordered_attributes = True
+    for handler, fn in handlers.items():
+        setattr(parser, handler, fn)
     try:
-        parsed = xml.dom.minidom.parseString(raw)
-        pretty = parsed.toprettyxml(indent=indent)
-        # remove blank lines added by toprettyxml()
-        lines = [line for line in pretty.splitlines() if line.strip()]
-        return "\n".join(lines)
-    except Exception:
-        return raw
+        parser.Parse(raw, True)
+    except expat.ExpatError as e:
+        raise PrettyXmlError(name, e.lineno, e.offset, expat.ErrorString(e.code)) from None
 
 
-def register_global_macros(env: Environment) -> None:
+def minify_xml(raw: str, name: str | None = None) -> str:
     """
-    Load all .j2 files under tpl/_macros and register each as env.globals[name].
+    Return raw without comments and insignificant whitespace (release builds).
+    Same tree as raw in the sense of xml_tree(); text mixed with CDATA is kept
+    as written, where pretty_xml() reflows it.
+    Raises PrettyXmlError (with name and line) if raw is not well-formed XML.
     """
-    macros_dir = SCRIPT_DIR / "_macros"
-    if not macros_dir.exists():
-        return
+    writer = _MinifyWriter()
+    _parse(
+        raw,
+        name,
+        StartElementHandler=writer.start,
+        EndElementHandler=writer.end,
+        CharacterDataHandler=writer.text,
+        StartCdataSectionHandler=writer.start_cdata,
+        EndCdataSectionHandler=writer.end_cdata,
+        ProcessingInstructionHandler=writer.instruction,
+    )
+    return "".join(writer.out)
+
+
+def xml_tree(text: str, name: str | None = None) -> tuple:
+    """
+    The content of an XML document as nested tuples, for comparing formattings:
+    (tag, ((attr, value), ...), (child, ...)) per element, a child being an
+    element, the stripped text between two nodes (CDATA included; omitted when
+    empty) or ("?", target, data) for a processing instruction. Comments and
+    whitespace around text, which the pretty form reflows anyway, are ignored.
+    """
+    root = ("", (), [])
+    stack = [root]
+    text_runs = []
+
+    def flush():
+        data = "".join(text_runs).strip()
+        text_runs.clear()
+        if data:
+            stack[-1][2].append(data)
+
+    def start(tag, attrs):
+        flush()
+        element = (tag, tuple(zip(attrs[::2], attrs[1::2])), [])
+        stack[-1][2].append(element)
+        stack.append(element)
+
+    def end(tag):
+        flush()
+        stack.pop()
+
+    def instruction(target, data):
+        flush()
+        stack[-1][2].append(("?", target, data))
+
+    _parse(
+        text,
+        name,
+        StartElementHandler=start,
+        EndElementHandler=end,
+        CharacterDataHandler=text_runs.append,
+        ProcessingInstructionHandler=instruction,
+    )
+
+    def freeze(node):
+        return node if isinstance(node, str) or node[0] == "?" else (node[0], node[1], tuple(map(freeze, node[2])))
+
+    return freeze(root)[2]
+
+
+class Target(namedtuple("Target", ("version", "suffix"), defaults=(None, ""))):
+    """A Bannerlord version to render for, and the stem suffix of its outputs."""
 
-    for path in macros_dir.glob("*.j2"):
-        if path.name.startswith(("_", ".")):
+    __slots__ = ()
+
+
+def parse_targets(spec: str) -> list[Target]:
+    """
+    Parse a --versions spec: comma-separated VERSION[:SUFFIX] items, e.g. "13,14".
+    Without an explicit suffix the first version writes the base files and every
+    other version writes "_BL<version>" variants ("13,14" -> "", "_BL14").
+    """
+    targets = []
+    for i, item in enumerate(part.strip() for part in spec.split(",")):
+        if not item:
             continue
+        version, sep, suffix = item.partition(":")
+        if not version.isdigit():
+            raise ValueError(f"invalid version '{version}' in '{spec}'")
+        if not sep:
+            suffix = "" if i == 0 else f"_BL{version}"
+        targets.append(Target(version, suffix))
+    if not targets:
+        raise ValueError("no versions given")
+    return targets
 
-        name = path.stem  # e.g. "button"
-        try:
-            module = env.get_template(path.name).module
-            env.globals[name] = module
-        except Exception as e:
-            print(f"[WARN] Failed to register macro '{name}': {e}", file=sys.stderr)
 
+def version_globals(bl_version: str | None = None) -> dict:
+    """
+    Return the version-specific globals exposed to templates: version, vttb, vbtt.
+    """
+    if bl_version is None:
+        bl_version = "12"
+
+    # StackLayout vertical direction fix:
+    # In BL13 and earlier, VerticalTopToBottom and VerticalBottomToTop were swapped
+    # (bug in the engine). BL14 fixes this, so the values must be swapped in templates
+    # to maintain the same visual result across versions.
+    # vttb = value to write when you want children to stack visually top-to-bottom
+    # vbtt = value to write when you want children to stack visually bottom-to-top
+    if int(bl_version) >= 14:
+        vttb, vbtt = "VerticalTopToBottom", "VerticalBottomToTop"
+    else:
+        vttb, vbtt = "VerticalBottomToTop", "VerticalTopToBottom"
+
+    return {"version": str(bl_version), "vttb": vttb, "vbtt": vbtt}
+
+
+class LazyMacroModule:
+    """
+    A global macro module (tpl/_macros/<name>.j2) as templates see it, e.g.
+    button.primary(...). The template is compiled (by env, a target environment
+    whose globals already hold render_globals) and evaluated against
+    render_globals on first use, so a render only pays for the macro modules
+    it actually calls. Errors in a macro file surface as template errors of
+    the templates using it.
+    """
+
+    def __init__(self, env: "jinja2.Environment", template_name: str, render_globals: dict):
+        self._env = env
+        self._template_name = template_name
+        self._render_globals = render_globals
+        self._module = None
 
-def build_env(loader_path: Path, bl_version: str | None = None) -> Environment:
+    def __getattr__(self, attr: str):
+        # Protocol probes (__html__, __iter__, ...) must not trigger a compile
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        if self._module is None:
+            self._module = self._env.get_template(self._template_name).make_module(self._render_globals)
+        return getattr(self._module, attr)
+
+
+def load_global_macros(env: "jinja2.Environment", render_globals: dict) -> dict:
+    """
+    Expose all .j2 files under tpl/_macros as lazy modules bound to render_globals,
+    returned as {name: LazyMacroModule}. Templates are parsed once per module
+    (the bytecode cache is shared); only loading and evaluating the module is
+    repeated per version.
+    """
+    # e.g. "button.j2" -> button
+    return {Path(name).stem: LazyMacroModule(env, name, render_globals) for name in global_macro_names()}
+
+
+def build_target_env(env: "jinja2.Environment", bl_version: str | None = None) -> "jinja2.Environment":
+    """
+    Return an overlay of env for one version whose globals are the version globals
+    plus the global macros. They are environment globals rather than render
+    variables so that templates pulled in by {% import %} / {% from ... import %},
+    which don't receive the render context, still see them.
+    The overlay shares env's loader and bytecode cache but gets its own template
+    cache: templates loaded by env (or another version) are bound to other globals.
+    """
+    render_globals = version_globals(bl_version)
+    target_env = env.overlay(cache_size=getattr(env.cache, "capacity", 400))
+    target_env.globals = {**env.globals, **render_globals}
+    target_env.globals.update(load_global_macros(target_env, render_globals))
+    return target_env
+
+
+def build_env(loader_path: Path) -> "jinja2.Environment":
     """
     Create a Jinja2 Environment with access to both:
       - the module-specific directory (loader_path)
       - the global macros directory (SCRIPT_DIR / "_macros")
-    Optionally register a 'version' global when bl_version is provided.
+    Version-specific values are not baked in: they come from build_target_env()
+    overlays, so each template is parsed once and rendered for every version.
+    Compiled templates are persisted under BYTECODE_CACHE_DIR so later runs
+    skip parsing templates whose source did not change.
     """
+    from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, ChoiceLoader
+
     loaders = [
         FileSystemLoader(str(loader_path)),
         FileSystemLoader(str(SCRIPT_DIR / "_macros")),
     ]
-    env = Environment(
+    BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return Environment(
         loader=ChoiceLoader(loaders),
+        bytecode_cache=FileSystemBytecodeCache(str(BYTECODE_CACHE_DIR)),
         autoescape=False,
         trim_blocks=True,
         lstrip_blocks=True,
     )
 
-    # Expose the version to templates via env.globals if provided
-    if bl_version is None:
-        bl_version = "12"
 
-    env.globals["version"] = str(bl_version)
+def render_template(target_env: "jinja2.Environment", template_rel_path: Path) -> str:
+    """
+    Render a single template for one version.
+    target_env is an environment built by build_target_env().
+    template_rel_path is the path relative to the module dir (can include subfolders).
+    """
+    tpl = target_env.get_template(template_rel_path.as_posix())
+    return tpl.render()
 
-    # StackLayout vertical direction fix:
-    # In BL13 and earlier, VerticalTopToBottom and VerticalBottomToTop were swapped
-    # (bug in the engine). BL14 fixes this, so the values must be swapped in templates
-    # to maintain the same visual result across versions.
-    # vttb = value to write when you want children to stack visually top-to-bottom
-    # vbtt = value to write when you want children to stack visually bottom-to-top
-    if int(bl_version) >= 14:
-        env.globals["vttb"] = "VerticalTopToBottom"
-        env.globals["vbtt"] = "VerticalBottomToTop"
-    else:
-        env.globals["vttb"] = "VerticalBottomToTop"
-        env.globals["vbtt"] = "VerticalTopToBottom"
 
-    register_global_macros(env)
-    return env
+def write_atomic(path: Path, text: str | bytes) -> None:
+    """
+    Write text (or bytes, as-is) to path through a temporary sibling file and an
+    atomic rename, so readers (the game, a deploy copy) never see a half-written file.
+    """
+    import tempfile
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") if isinstance(text, bytes) else os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+# Per-process warm state, reused across every render of a run (and, in worker
+# processes, across every job the worker receives): {module_dir: (env, {target: target env})}
+_WARM: dict[Path, tuple["jinja2.Environment", dict]] = {}
+
+
+def warm_env(module_dir: Path) -> "jinja2.Environment":
+    """Return this process' environment for module_dir, building it on first use."""
+    if module_dir not in _WARM:
+        _WARM[module_dir] = (build_env(module_dir), {})
+    return _WARM[module_dir][0]
+
 
+def warm_target_env(module_dir: Path, target: Target) -> "jinja2.Environment":
+    """Return this process' target environment for (module_dir, target), building it on first use."""
+    env = warm_env(module_dir)
+    target_envs = _WARM[module_dir][1]
+    if target not in target_envs:
+        target_envs[target] = build_target_env(env, target.version)
+    return target_envs[target]
 
-def render_template(module_dir: Path, template_rel_path: Path, context: dict | None = None, bl_version: str | None = None) -> str:
+
+def invalidate_target_envs(module_dir: Path) -> None:
+    """Drop this process' target environments for module_dir (e.g. after a global macro changed)."""
+    if module_dir in _WARM:
+        _WARM[module_dir][1].clear()
+
+
+def render_output(
+    module_dir: Path, rel: Path, target: Target, out_path: Path, minify: bool = False
+) -> tuple[str | None, str | None, list[dict], tuple[int, int] | None]:
     """
-    Render a single template which is located under module_dir.
-    template_rel_path is the path relative to module_dir (can include subfolders).
-    bl_version, if provided, is injected into the template context (key: 'version').
+    Render, pretty-print (or minify) and write one output file.
+    Returns (hash of the written file, None, phases, sizes) or (None, error message, phases, None),
+    phases being the render/pretty/minify/write timings of this file (see tools/timings.py).
+    With minify, the compact form is checked against the rendered one (same xml_tree())
+    and sizes is (pretty bytes, written bytes); otherwise sizes is None.
     """
-    env = build_env(module_dir, bl_version=bl_version)
-    tpl = env.get_template(template_rel_path.as_posix())
+    from jinja2 import TemplateError
 
-    # Ensure version is present in the render context if provided
-    render_ctx = dict(context or {})
-    if bl_version is not None and "version" not in render_ctx:
-        render_ctx["version"] = bl_version
+    name = str(module_dir / rel)
+    timings = Timings("render_prefabs")
+    sizes = None
+    try:
+        with timings.phase("render"):
+            raw = render_template(warm_target_env(module_dir, target), rel)
+        with timings.phase("pretty"):
+            text = pretty_xml(raw, name=name)
+        if minify:
+            with timings.phase("minify"):
+                compact = minify_xml(raw, name=name)
+                # Compared with the render itself: pretty_xml() reflows text mixed with CDATA
+                if xml_tree(compact) != xml_tree(raw):
+                    return None, f"Minified {name} differs from its rendered form", timings.phases, None
+                sizes = (len(text.encode("utf-8")), len(compact.encode("utf-8")))
+                text = compact
+    except TemplateError as e:
+        return None, f"Template error rendering {name}: {e}", timings.phases, None
+    except PrettyXmlError as e:
+        return None, str(e), timings.phases, None
 
-    return tpl.render(render_ctx)
+    with timings.phase("write"):
+        write_atomic(out_path, text)
+    return digest(out_path.read_bytes()), None, timings.phases, sizes
 
 
-def process_module(module_dir: Path, bl_version: str | None = None, suffix: str = "") -> None:
-    """
-    Find all .j2 files under module_dir, render them and write to gui output.
-    Output root: ../gui/{ModuleName}/PrefabExtensions/ClanScreen/<same relative path>.xml
+def _render_job(job: tuple) -> tuple[str | None, str | None, list[dict], tuple[int, int] | None]:
+    return render_output(*job)
+
 
-    suffix: optional string appended to each output filename stem (e.g. "_BL14").
-    Use this to generate alternate-version variants alongside the base files.
+def make_pool(jobs: int, trace_memory: bool = False):
     """
-    module_name = module_dir.name
-    out_base = OUTPUT_BASE / module_name / "PrefabExtensions" / "ClanScreen"
+    Return a process pool for jobs workers (0 = one per CPU), or a null context
+    yielding None when rendering should stay in this process.
+    With trace_memory, workers trace allocations so their phases report peak memory.
+    """
+    workers = jobs or os.cpu_count() or 1
+    if workers <= 1:
+        return nullcontext(None)
+    import tracemalloc
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=workers, initializer=tracemalloc.start if trace_memory else None)
+
 
-    for j2_file in module_dir.rglob("*.j2"):
+def iter_templates(module_dir: Path):
+    """
+    Yield the paths (relative to module_dir) of the top-level templates to render,
+    in a stable order.
+    """
+    for j2_file in sorted(module_dir.rglob("*.j2")):
         # skip caches or hidden
         if any(part.startswith(".") for part in j2_file.parts):
             continue
@@ -126,21 +573,456 @@ def process_module(module_dir: Path, bl_version: str | None = None, suffix: str
         # by filename or by any folder in their relative path
         if any(part.startswith((".", "_")) for part in rel.parts):
             continue
-        out_rel = rel.with_suffix(".xml")
-        if suffix:
-            out_rel = out_rel.with_stem(out_rel.stem + suffix)
-        out_path = out_base / out_rel
-        out_path.parent.mkdir(parents=True, exist_ok=True)
+        yield rel
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                  incremental rendering                 #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def template_sources(module_dir: Path) -> dict[str, Path]:
+    """
+    Map every template name the environment can load to its file, following the
+    ChoiceLoader order of build_env(): module templates shadow global macros.
+    """
+    sources = {}
+    macros_dir = SCRIPT_DIR / "_macros"
+    if macros_dir.exists():
+        for path in sorted(macros_dir.glob("*.j2")):
+            sources[path.name] = path
+    for path in sorted(module_dir.rglob("*.j2")):
+        rel = path.relative_to(module_dir)
+        if any(part.startswith(".") for part in rel.parts):
+            continue
+        sources[rel.as_posix()] = path
+    return sources
 
+
+def global_macro_names() -> list[str]:
+    """Names of the macro templates loaded into every render context."""
+    macros_dir = SCRIPT_DIR / "_macros"
+    if not macros_dir.exists():
+        return []
+    return [p.name for p in sorted(macros_dir.glob("*.j2")) if not p.name.startswith(("_", "."))]
+
+
+def scan_dependencies(env_factory, sources: dict[str, Path], previous: dict, cache=None) -> dict:
+    """
+    Return {name: {"hash", "refs", "dynamic"}} for every template in sources.
+    refs are the templates named by include/import/extends; dynamic is set when a
+    reference is not a constant (e.g. {% include some_var %}), in which case the
+    template is treated as depending on every template of the module.
+    Files whose hash matches the previous manifest, or that the render cache
+    scanned before, reuse their refs without parsing.
+    """
+    files = {}
+    for name, path in sources.items():
+        data = path.read_bytes()
+        h = digest(data)
+        cached = previous.get(name)
+        if cached and cached.get("hash") == h:
+            files[name] = cached
+            continue
+        scanned = cache.get_scan(h) if cache is not None else None
+        if scanned is not None:
+            files[name] = {"hash": h, **scanned}
+            continue
+
+        from jinja2 import TemplateError, meta
+
+        refs, dynamic = set(), False
         try:
-            rendered = render_template(module_dir, rel, {}, bl_version=bl_version)
-            rendered = pretty_xml(rendered)
-        except TemplateError as e:
-            print(f"[ERROR] Template error rendering {j2_file}: {e}", file=sys.stderr)
+            ast = env_factory().parse(data.decode("utf-8"), name, str(path))
+            for ref in meta.find_referenced_templates(ast):
+                if ref is None:
+                    dynamic = True
+                else:
+                    refs.add(ref)
+        except TemplateError:
+            # Syntax errors surface when rendering; depend on everything meanwhile
+            files[name] = {"hash": h, "refs": sorted(refs), "dynamic": True}
+            continue
+        files[name] = {"hash": h, "refs": sorted(refs), "dynamic": dynamic}
+        if cache is not None:
+            cache.put_scan(h, files[name]["refs"], dynamic)
+    return files
+
+
+def dependency_closure(name: str, files: dict) -> list[str]:
+    """
+    Return the sorted names of name, everything it transitively references,
+    and the global macros (which every render context loads).
+    """
+    seen = set()
+    stack = [name, *global_macro_names()]
+    while stack:
+        current = stack.pop()
+        if current in seen or current not in files:
             continue
+        seen.add(current)
+        entry = files[current]
+        stack.extend(files if entry["dynamic"] else entry["refs"])
+    return sorted(seen)
+
+
+def render_key(deps: list[str], files: dict, render_globals: dict, suffix: str, minify: bool = False) -> str:
+    """
+    Hash everything an output depends on: its templates, the render globals,
+    the suffix, the output form and this script (so renderer changes invalidate every output).
+    """
+    payload = {
+        "renderer": RENDERER_HASH,
+        "deps": {name: files[name]["hash"] for name in deps},
+        "globals": render_globals,
+        "suffix": suffix,
+        "minify": minify,
+    }
+    return digest(json.dumps(payload, sort_keys=True).encode("utf-8"))
+
+
+def manifest_path(module_name: str) -> Path:
+    return MANIFEST_DIR / f"{module_name}.manifest.json"
+
+
+def load_manifest(path: Path) -> dict | None:
+    """Return the manifest at path, or None when missing, unreadable or outdated."""
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        return None
+    return manifest
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    write_atomic(path, json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+
+
+def is_up_to_date(out_path: Path, entry: dict | None, key: str) -> bool:
+    """True when the manifest entry matches key and the output on disk is intact."""
+    if not entry or entry.get("key") != key:
+        return False
+    try:
+        return digest(out_path.read_bytes()) == entry.get("hash")
+    except OSError:
+        return False
+
+
+def remove_output(out_base: Path, out_rel: str) -> None:
+    """Delete a generated file and prune the directories it leaves empty."""
+    path = out_base / out_rel
+    path.unlink(missing_ok=True)
+    for parent in path.parents:
+        if parent == out_base or not parent.is_relative_to(out_base):
+            break
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+
+
+def process_module(
+    module_dir: Path,
+    targets: list[Target],
+    force: bool = False,
+    pool=None,
+    timings: Timings | None = None,
+    minify: bool = False,
+    cache=None,
+) -> bool:
+    """
+    Find all .j2 files under module_dir, render them once per target and write to gui output.
+    Output root: ../gui/{ModuleName}/PrefabExtensions/ClanScreen/<same relative path>.xml
+
+    Each target's suffix is appended to the output filename stem (e.g. "_BL14"),
+    which is how alternate-version variants are generated alongside the base files.
+
+    Rendering is incremental: a manifest under MANIFEST_DIR records, per output,
+    a key over its template dependency graph (include/import/extends and the
+    global macros), content hashes and render globals. Only outputs whose key
+    changed are rendered, and outputs whose template disappeared are deleted.
+    Without a usable manifest (or with force) the module output is rebuilt from scratch.
+
+    pool: optional process pool (see make_pool()) to spread rendering across workers.
+    timings: optional Timings recording discovery, dependency scan and per-output
+    render/pretty/write phases.
+    minify: write the compact form (release builds) and report its size per file.
+    cache: optional render_cache.RenderCache (see open_cache()). Outputs to render
+    are first looked up there by key and written from it on a hit (except with
+    force); rendered outputs are stored in it, so returning to sources rendered
+    before (e.g. after switching branches back) costs no rendering, nor any
+    template parsing when their references were scanned before too.
+
+    Returns False if any template failed to render.
+    """
+    module_name = module_dir.name
+    timings = timings or Timings("render_prefabs", enabled=False)
+    module_out = OUTPUT_BASE / module_name
+    out_base = module_out / "PrefabExtensions" / "ClanScreen"
+
+    m_path = manifest_path(module_name)
+    manifest = None if force else load_manifest(m_path)
+    if manifest is None:
+        # No trustworthy record of what is on disk: start from a clean slate so
+        # stale files (e.g. from other branches) don't survive
+        shutil.rmtree(module_out, ignore_errors=True)
+        manifest = {"format": MANIFEST_FORMAT, "files": {}, "outputs": {}}
+
+    with timings.phase("discover", module_name):
+        sources = template_sources(module_dir)
+        templates = list(iter_templates(module_dir))
+
+    # The environment is only built when something must be parsed or rendered
+    with timings.phase("dependencies", module_name):
+        files = scan_dependencies(lambda: warm_env(module_dir), sources, manifest["files"], cache)
+    old_outputs = manifest["outputs"]
+    outputs = {}
+    pending = []  # (out_key, entry, job) still to render, in walk order
+    skipped = 0
+
+    for rel in templates:
+        deps = dependency_closure(rel.as_posix(), files)
+        # The outputs of a template are rendered together, so variants can be
+        # compared with their base output
+        group = []
+        stale = False
+        for target in targets:
+            out_rel = rel.with_suffix(".xml")
+            if target.suffix:
+                out_rel = out_rel.with_stem(out_rel.stem + target.suffix)
+            out_key = out_rel.as_posix()
+            out_path = out_base / out_rel
 
-        out_path.write_text(rendered, encoding="utf-8")
-        print(f"→ {module_dir.name}/{j2_file.stem}{suffix}.xml")
+            render_globals = version_globals(target.version)
+            key = render_key(deps, files, render_globals, target.suffix, minify)
+            old = old_outputs.get(out_key)
+            # A variant identical to its base output was not written: the base file stands for it
+            on_disk = out_base / old["same_as"] if old and old.get("same_as") else out_path
+            stale = stale or not is_up_to_date(on_disk, old, key)
+
+            entry = {
+                "template": rel.as_posix(),
+                "suffix": target.suffix,
+                "globals": render_globals,
+                "deps": deps,
+                "key": key,
+            }
+            group.append((out_key, entry, (module_dir, rel, target, out_path, minify)))
+
+        if not stale:
+            for out_key, _, _ in group:
+                outputs[out_key] = old_outputs[out_key]
+            skipped += len(group)
+            continue
+        pending.extend(group)
+
+    # Outputs rendered before (in any checkout) are written from the render cache
+    results = [None] * len(pending)
+    if cache is not None and pending and not force:
+        with timings.phase("cache", module_name):
+            for i, (_, entry, job) in enumerate(pending):
+                hit = cache.get(entry["key"])
+                if hit is None:
+                    continue
+                data, pretty_size = hit
+                write_atomic(job[3], data)
+                results[i] = (digest(data), None, [], (pretty_size, len(data)) if minify else None)
+    cached = {i for i, result in enumerate(results) if result is not None}
+
+    # Render + pretty-print + write the rest, in this process or across the pool.
+    # Results come back in submission order, so output and errors are deterministic.
+    misses = [i for i in range(len(pending)) if i not in cached]
+    jobs = [pending[i][2] for i in misses]
+    for i, result in zip(misses, pool.map(_render_job, jobs) if pool is not None else map(_render_job, jobs)):
+        results[i] = result
+    failed = set()
+    done = []  # (out_key, sizes, cached) of the outputs written now
+    for i, ((out_key, entry, job), (out_hash, error, phases, sizes)) in enumerate(zip(pending, results)):
+        timings.extend([{**p, "item": f"{module_name}/{out_key}"} for p in phases])
+        if error is not None:
+            print(f"[ERROR] {error}", file=sys.stderr)
+            remove_output(out_base, out_key)
+            failed.add(out_key)
+            continue
+        if cache is not None and i not in cached:
+            with timings.phase("cache", module_name):
+                cache.put(entry["key"], job[3].read_bytes(), sizes[0] if sizes else None)
+        outputs[out_key] = {**entry, "hash": out_hash}
+        done.append((out_key, sizes, i in cached))
+
+    # Variants rendered byte-identical to their base output (the template doesn't
+    # depend on the version globals) are not shipped
+    has_base = any(not target.suffix for target in targets)
+    rendered = deduplicated = 0
+    size_before = size_after = 0
+    from_cache = 0
+    for out_key, sizes, hit in done:
+        entry = outputs[out_key]
+        base_key = Path(entry["template"]).with_suffix(".xml").as_posix()
+        base = outputs.get(base_key) if has_base and entry["suffix"] else None
+        if base is not None and base["hash"] == entry["hash"]:
+            remove_output(out_base, out_key)
+            entry["same_as"] = base_key
+            deduplicated += 1
+            print(f"→ {module_name}/{Path(out_key).stem}.xml  same as {Path(base_key).stem}.xml, not written")
+            continue
+        rendered += 1
+        from_cache += hit
+        note = "  (cached)" if hit else ""
+        if sizes is None:
+            print(f"→ {module_name}/{Path(out_key).stem}.xml{note}")
+            continue
+        size_before += sizes[0]
+        size_after += sizes[1]
+        print(f"→ {module_name}/{Path(out_key).stem}.xml  {format_size_change(*sizes)}{note}")
+
+    # Orphans: outputs of the suffixes rendered now whose template is gone.
+    # Outputs of other suffixes (rendered by other invocations) are kept as-is.
+    suffixes = {target.suffix for target in targets}
+    removed = 0
+    for out_key, entry in old_outputs.items():
+        if out_key in outputs or out_key in failed:
+            continue
+        if entry.get("suffix") in suffixes:
+            remove_output(out_base, out_key)
+            removed += 1
+        else:
+            outputs[out_key] = entry
+
+    manifest["files"] = files
+    manifest["outputs"] = outputs
+    with timings.phase("manifest", module_name):
+        save_manifest(m_path, manifest)
+        write_variants_list(module_out, outputs)
+
+    cached_note = f" ({from_cache} from cache)" if from_cache else ""
+    skipped_note = f", {deduplicated} identical variants not written" if deduplicated else ""
+    print(f"[OK] {module_name}: {rendered} rendered{cached_note}{skipped_note}, {skipped} up to date, {removed} removed")
+    if minify and rendered:
+        print(f"[OK] {module_name}: minified {rendered} files, {format_size_change(size_before, size_after)}")
+    return not failed
+
+
+def write_variants_list(module_out: Path, outputs: dict) -> None:
+    """Write VARIANTS_NAME: the stems of the suffixed outputs that exist on disk (rewritten only on change)."""
+    stems = sorted(Path(key).stem for key, entry in outputs.items() if entry.get("suffix") and not entry.get("same_as"))
+    text = (
+        "# Prefab variants that differ from their base prefab (generated by tpl/render_prefabs.py).\n"
+        "# A variant not listed here is identical to its base prefab, which is loaded instead.\n"
+    ) + "".join(f"{stem}\n" for stem in stems)
+    path = module_out / VARIANTS_NAME
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return
+    except OSError:
+        pass
+    write_atomic(path, text)
+
+
+def format_size_change(before: int, after: int) -> str:
+    saved = 1 - after / before if before else 0.0
+    return f"{before:,} -> {after:,} bytes (-{saved:.0%})"
+
+
+def open_cache(enabled: bool = True):
+    """
+    Return the render cache shared by every checkout (render_cache.RenderCache,
+    under ~/.cache/retinues/prefabs unless $RETINUES_PREFAB_CACHE says otherwise),
+    or None when disabled (enabled=False or RETINUES_PREFAB_CACHE=off).
+    Nothing is opened until the first lookup; call close() when done.
+    """
+    if not enabled or os.environ.get("RETINUES_PREFAB_CACHE") == "off":
+        return None
+    from render_cache import RenderCache
+
+    return RenderCache()
+
+
+def print_cache_stats(cache) -> None:
+    stats = cache.stats()
+    if stats is None:
+        return
+    hit_rate = f"{stats['hit_rate']:.1%}" if stats["hit_rate"] is not None else "-"
+    oldest = time.strftime("%Y-%m-%d %H:%M", time.localtime(stats["oldest_use"])) if stats["oldest_use"] else "-"
+    print(f"Prefab render cache: {cache.root}")
+    print(f"  Entries   : {stats['entries']:,} keys, {stats['blobs']:,} distinct files")
+    print(f"  Size      : {stats['size'] / 2**20:.1f} MB of {stats['max_size'] / 2**20:.0f} MB")
+    print(f"  Lookups   : {stats['hits']:,} hits, {stats['misses']:,} misses (hit rate {hit_rate})")
+    print(f"  Stored    : {stats['stores']:,}, evicted: {stats['evictions']:,}")
+    print(f"  Oldest use: {oldest}")
+
+
+def iter_modules():
+    """Yield the template module folders under SCRIPT_DIR (e.g. tpl/Retinues)."""
+    for entry in sorted(SCRIPT_DIR.iterdir()):
+        if not entry.is_dir():
+            continue
+        # skip hidden, underscore-prefixed module folders, and caches
+        if entry.name.startswith((".", "_")) or entry.name == "__pycache__":
+            continue
+        yield entry
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                       watch mode                       #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+
+def snapshot_templates() -> dict[Path, tuple[int, int]]:
+    """Return {path: (mtime_ns, size)} for every .j2 file under SCRIPT_DIR."""
+    snapshot = {}
+    for path in SCRIPT_DIR.rglob("*.j2"):
+        if any(part.startswith(".") for part in path.relative_to(SCRIPT_DIR).parts):
+            continue
+        try:
+            st = path.stat()
+        except OSError:
+            continue  # deleted while walking
+        snapshot[path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+def watch(targets: list[Target], interval: float = 0.2, cache=None) -> int:
+    """
+    Poll tpl/ for template changes and re-render the affected prefabs until interrupted.
+    Runs in-process so environments stay warm between changes: Jinja reloads the
+    templates whose files changed, and the per-version environments (globals and
+    macros) are rebuilt when a global macro changed. The manifest decides which outputs to re-render.
+    """
+    print(f"[OK] Watching {SCRIPT_DIR} for changes (Ctrl+C to stop)")
+    snapshot = snapshot_templates()
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot_templates()
+            if current == snapshot:
+                continue
+
+            # Let editors finish multi-step saves before rendering
+            time.sleep(0.05)
+            current = snapshot_templates()
+            changed = {p for p in snapshot.keys() | current.keys() if snapshot.get(p) != current.get(p)}
+            snapshot = current
+
+            macros_changed = any(p.is_relative_to(SCRIPT_DIR / "_macros") for p in changed)
+            t0 = time.perf_counter()
+            for module_dir in iter_modules():
+                if macros_changed:
+                    invalidate_target_envs(module_dir)
+                elif not any(p.is_relative_to(module_dir) for p in changed):
+                    continue
+                process_module(module_dir, targets, cache=cache)
+            if cache is not None:
+                cache.close()
+            print(f"[OK] Updated in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        return 0
 
 
 def main() -> int:
@@ -149,20 +1031,81 @@ def main() -> int:
         return 2
 
     parser = argparse.ArgumentParser(description="Render Jinja .j2 prefabs to XML")
-    parser.add_argument("-v", "--version", help="version string to pass into Jinja (available as 'version' in templates)")
+    versions = parser.add_mutually_exclusive_group()
+    versions.add_argument("-v", "--version", help="version string to pass into Jinja (available as 'version' in templates)")
+    versions.add_argument(
+        "--versions",
+        help="render several versions in one pass: comma-separated VERSION[:SUFFIX] "
+        "(e.g. '13,14' writes base files for 13 and '_BL14' variants for 14)",
+    )
     parser.add_argument("--suffix", default="", help="suffix appended to each output filename stem (e.g. '_BL14')")
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="release form: strip comments and indentation (checked against the rendered form), report sizes",
+    )
+    parser.add_argument("--force", action="store_true", help="ignore the build manifest and rebuild every output from scratch")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't use the prefab render cache shared by every checkout (~/.cache/retinues/prefabs)",
+    )
+    parser.add_argument("--cache-stats", action="store_true", help="print the render cache size and hit rate, then exit")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes used to render (0 = one per CPU, default: 1)")
+    parser.add_argument("--watch", action="store_true", help="after rendering, keep watching tpl/ and re-render affected prefabs on change")
+    parser.add_argument("--interval", type=float, default=0.2, help="--watch polling interval in seconds (default: 0.2)")
+    parser.add_argument(
+        "--timings",
+        type=Path,
+        metavar="FILE",
+        help="write per-phase wall time and peak memory (discovery, dependency scan, each render/pretty-print/write) as JSON",
+    )
+    parser.add_argument("--profile", type=Path, metavar="FILE", help="run under cProfile and dump the stats to FILE (main process only)")
     args = parser.parse_args()
 
-    for entry in sorted(SCRIPT_DIR.iterdir()):
-        if not entry.is_dir():
-            continue
-        # skip hidden, underscore-prefixed module folders, and caches
-        if entry.name.startswith((".", "_")) or entry.name == "__pycache__":
-            continue
+    if args.cache_stats:
+        cache = open_cache()
+        if cache is None:
+            print("[INFO] The prefab render cache is disabled (RETINUES_PREFAB_CACHE=off)")
+            return 0
+        print_cache_stats(cache)
+        cache.close()
+        return 0
+
+    if args.versions:
+        if args.suffix:
+            parser.error("--suffix cannot be combined with --versions (use VERSION:SUFFIX)")
+        try:
+            targets = parse_targets(args.versions)
+        except ValueError as e:
+            parser.error(f"--versions: {e}")
+    else:
+        targets = [Target(args.version, args.suffix)]
+
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    if args.watch and (args.timings or args.profile):
+        parser.error("--timings and --profile cannot be combined with --watch")
+    if args.watch and args.minify:
+        parser.error("--minify is meant for release builds and cannot be combined with --watch")
+
+    ok = True
+    cache = open_cache(not args.no_cache)
+    timings = Timings("render_prefabs", enabled=args.timings is not None, trace_memory=True)
+    with profiled(args.profile), make_pool(args.jobs, trace_memory=timings.enabled) as pool:
+        for module_dir in iter_modules():
+            ok = process_module(
+                module_dir, targets, force=args.force, pool=pool, timings=timings, minify=args.minify, cache=cache
+            ) and ok
+    if cache is not None:
+        cache.close()
+    if args.timings:
+        timings.write(args.timings)
 
-        process_module(entry, bl_version=args.version, suffix=args.suffix)
+    if args.watch:
+        return watch(targets, interval=args.interval, cache=cache)
 
-    return 0
+    return 0 if ok else 1
 
 
 if __name__ == "__main__":
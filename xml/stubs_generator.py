@@ -3,11 +3,22 @@
 # Generate minimal Bannerlord NPCCharacter stubs for Retinues.
 # Usage:
 #   python generate_stubs.py -n 100 -o stubs.xml --culture Culture.empire --start 0
+#   python generate_stubs.py --manifest stubs_manifest.json   # several pools in one run
+#   python generate_stubs.py -n 100 --append-to Retinues/troop_stubs.xml   # grow an existing file
 
 import argparse
+import itertools
+import json
 import math
+import os
+import re
+import shutil
 import sys
-import xml.etree.ElementTree as ET
+import tempfile
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree.ElementTree import iterparse
 
 DEFAULT_FACE_BY_CULTURE = {
     "Culture.empire": "BodyProperty.fighter_empire",
@@ -20,90 +31,416 @@ DEFAULT_FACE_BY_CULTURE = {
     "_default": "BodyProperty.fighter_empire",
 }
 
-def build_npc_character(
-    npc_id: str,
+ID_PREFIX = "retinues_custom_"
+XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+def escape_attr(value: str) -> str:
+    # Same escaping as ElementTree attribute serialization
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("\r", "&#13;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#09;")
+    )
+
+def stub_renderer(
     culture: str,
     default_group: str,
     level: int,
     face_key_template: str | None,
-) -> ET.Element:
-    npc = ET.Element("NPCCharacter", {
-        "id": npc_id,
-        "name": npc_id,
-        "is_hidden_encyclopedia": "true",
-        "default_group": default_group,
-        "level": str(level),
-        "is_basic_troop": "true",
-        "occupation": "Soldier",
-        "culture": culture,
-    })
-
+):
+    """
+    Return a function rendering one NPCCharacter stub for an id, exactly as
+    ElementTree writes it once indented with ET.indent(space="  ") inside
+    <NPCCharacters> (no leading indent, no trailing newline).
+    Everything but the id is the same for every stub, so it is formatted once.
+    """
+    tail = (
+        f'" is_hidden_encyclopedia="true" default_group="{escape_attr(default_group)}"'
+        f' level="{escape_attr(str(level))}" is_basic_troop="true" occupation="Soldier"'
+        f' culture="{escape_attr(culture)}"'
+    )
     if face_key_template:
-        face = ET.SubElement(npc, "face")
-        ET.SubElement(face, "face_key_template", {"value": face_key_template})
+        tail += (
+            ">\n    <face>\n"
+            f'      <face_key_template value="{escape_attr(face_key_template)}" />\n'
+            "    </face>\n  </NPCCharacter>"
+        )
+    else:
+        tail += " />"
+
+    def render(npc_id: str) -> str:
+        npc_id = escape_attr(npc_id)
+        return f'<NPCCharacter id="{npc_id}" name="{npc_id}{tail}'
+
+    return render
+
+def open_stub_file(path):
+    # Same file settings as ElementTree.write(path, encoding="utf-8")
+    return open(path, "w", encoding="utf-8", errors="xmlcharrefreplace")
+
+def write_stub_lines(f, npc_ids, render, batch: int = 4096) -> int:
+    """
+    Write stubs one per line, separated by newline + indent, without leading or
+    trailing whitespace. Returns the number of stubs written.
+    """
+    count = 0
+    chunk = []
+    for npc_id in npc_ids:
+        chunk.append(render(npc_id))
+        if len(chunk) >= batch:
+            f.write(("\n  " if count else "") + "\n  ".join(chunk))
+            count += len(chunk)
+            chunk.clear()
+    if chunk:
+        f.write(("\n  " if count else "") + "\n  ".join(chunk))
+        count += len(chunk)
+    return count
+
+def write_stubs(path, npc_ids, render, batch: int = 4096) -> int:
+    """
+    Stream stubs to path as they are produced: memory stays flat whatever the
+    number of ids. The bytes are those ElementTree would write for the whole
+    indented <NPCCharacters> tree (same declaration, escaping and file encoding).
+    Returns the number of stubs written.
+    """
+    npc_ids = iter(npc_ids)
+    first = next(npc_ids, None)
+    with open_stub_file(path) as f:
+        f.write(XML_DECLARATION)
+        if first is None:
+            f.write("<NPCCharacters />")
+            return 0
+        f.write("<NPCCharacters>\n  ")
+        count = write_stub_lines(f, itertools.chain([first], npc_ids), render, batch)
+        f.write("\n</NPCCharacters>")
+    return count
+
+def id_padding(max_index: int) -> int:
+    # Zero-padding width from the largest index, at least 4 digits for nice sorting
+    return max(4, int(math.log10(max(1, max_index))) + 1)
+
+def stub_ids(start: int, count: int, pad: int):
+    return (f"{ID_PREFIX}{str(i).zfill(pad)}" for i in range(start, start + count))
+
+def pick_face_template(culture: str, no_face: bool = False, face_template: str | None = None) -> str | None:
+    if no_face:
+        return None
+    if face_template:
+        return face_template
+    return DEFAULT_FACE_BY_CULTURE.get(culture, DEFAULT_FACE_BY_CULTURE["_default"])
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                    manifest (batch)                    #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#
+# A manifest describes a whole stub set in one JSON file:
+#
+#   {
+#     "output": "Retinues/troop_stubs.xml",   # default output of every pool
+#     "start": 0,                             # first index (default: 0)
+#     "pools": [
+#       {"name": "empire_infantry", "culture": "Culture.empire", "group": "Infantry", "count": 200},
+#       {"name": "aserai_cavalry", "culture": "Culture.aserai", "group": "Cavalry", "level": 6,
+#        "count": 50, "output": "Retinues/troop_stubs_aserai.xml"},
+#       ...
+#     ]
+#   }
+#
+# Pool keys mirror the command-line options: culture, group, level, count,
+# no_face, face_template, plus an optional per-pool output (relative paths are
+# resolved against the manifest's folder). Pools get consecutive, non-overlapping
+# id ranges in manifest order, all padded to the same width. Pools sharing an
+# output are written to it in manifest order; each pool is rendered in parallel.
+
+POOL_KEYS = {"name", "culture", "group", "level", "count", "no_face", "face_template", "output"}
+
+def load_manifest(path: Path) -> dict:
+    """Read and validate a manifest; return {"start", "pools": [pool dicts with defaults filled]}."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read {path}: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get("pools"), list) or not data["pools"]:
+        raise ValueError("expected an object with a non-empty 'pools' list")
+
+    start = data.get("start", 0)
+    if not isinstance(start, int) or start < 0:
+        raise ValueError("'start' must be a non-negative integer")
+
+    pools = []
+    names = set()
+    for i, raw in enumerate(data["pools"]):
+        if not isinstance(raw, dict):
+            raise ValueError(f"pool #{i} must be an object")
+        unknown = set(raw) - POOL_KEYS
+        if unknown:
+            raise ValueError(f"pool #{i}: unknown keys {sorted(unknown)}")
+        pool = {
+            "name": raw.get("name", f"pool{i}"),
+            "culture": raw.get("culture", "Culture.empire"),
+            "group": raw.get("group", "Infantry"),
+            "level": raw.get("level", 1),
+            "count": raw.get("count"),
+            "output": raw.get("output", data.get("output")),
+        }
+        if not isinstance(pool["count"], int) or pool["count"] < 0:
+            raise ValueError(f"pool '{pool['name']}': 'count' must be a non-negative integer")
+        if not isinstance(pool["level"], int):
+            raise ValueError(f"pool '{pool['name']}': 'level' must be an integer")
+        if not pool["output"]:
+            raise ValueError(f"pool '{pool['name']}': no 'output' (set it on the pool or at the top level)")
+        if pool["name"] in names:
+            raise ValueError(f"duplicate pool name '{pool['name']}'")
+        names.add(pool["name"])
+        pool["output"] = path.parent / pool["output"]
+        pool["face_template"] = pick_face_template(pool["culture"], raw.get("no_face", False), raw.get("face_template"))
+        pools.append(pool)
+
+    return {"start": start, "pools": pools}
 
-    return npc
+def allocate_ids(manifest: dict) -> int:
+    """Give each pool a consecutive id range ("start"); return the common padding width."""
+    index = manifest["start"]
+    for pool in manifest["pools"]:
+        pool["start"] = index
+        index += pool["count"]
+    return id_padding(index - 1)
+
+def _write_pool_fragment(job) -> int:
+    # Worker: one pool's stub lines, to be spliced into its output file
+    fragment, pool, pad = job
+    render = stub_renderer(pool["culture"], pool["group"], pool["level"], pool["face_template"])
+    with open_stub_file(fragment) as f:
+        return write_stub_lines(f, stub_ids(pool["start"], pool["count"], pad), render)
+
+def generate_manifest(manifest: dict, pad: int, jobs: int = 0) -> dict[Path, int]:
+    """
+    Render every pool of a manifest whose ids were allocated (see allocate_ids())
+    with the given padding, in parallel with jobs != 1 (0 = one per CPU), and
+    assemble the output files. Returns {output path: stubs written}.
+    """
+    pools = manifest["pools"]
+
+    with tempfile.TemporaryDirectory(prefix="stubs-") as tmp:
+        fragments = [Path(tmp) / f"{i}.part" for i in range(len(pools))]
+        job_args = [(fragment, pool, pad) for fragment, pool in zip(fragments, pools)]
+        workers = jobs or os.cpu_count() or 1
+        if workers <= 1 or len(pools) < 2:
+            list(map(_write_pool_fragment, job_args))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pools))) as pool_executor:
+                list(pool_executor.map(_write_pool_fragment, job_args))
+
+        # Splice fragments into their outputs, in manifest order, with the same
+        # framing write_stubs() produces for a single pool
+        by_output: dict[Path, list[int]] = {}
+        for i, pool in enumerate(pools):
+            by_output.setdefault(pool["output"], []).append(i)
+
+        written = {}
+        for output, indices in by_output.items():
+            parts = [i for i in indices if pools[i]["count"]]
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with open_stub_file(output) as f:
+                f.write(XML_DECLARATION)
+                if not parts:
+                    f.write("<NPCCharacters />")
+                else:
+                    f.write("<NPCCharacters>\n  ")
+                    for n, i in enumerate(parts):
+                        if n:
+                            f.write("\n  ")
+                        f.flush()
+                        with open(fragments[i], "rb") as src:
+                            shutil.copyfileobj(src, f.buffer)
+                    f.write("\n</NPCCharacters>")
+            written[output] = sum(pools[i]["count"] for i in indices)
+
+    return written
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+#                     append (grow)                      #
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+
+RE_STUB_INDEX = re.compile(re.escape(ID_PREFIX) + r"(\d+)")
+RE_ROOT_END = re.compile(rb"</NPCCharacters\s*>|<NPCCharacters\s*/>")
+
+def index_stub_ids(path: Path, want_used: bool = False) -> dict:
+    """
+    Stream-parse an NPCCharacters file (iterparse, constant memory) and return
+    {"count": stubs, "max": highest retinues_custom_ index or None,
+     "pad": zero-padding width used by its ids or None, "used": set of indices
+     (only with want_used)}. The padding is the narrowest digit run among the
+     existing ids: overflowed indices (e.g. 10000 with 4 digits) keep it.
+    """
+    index = {"count": 0, "max": None, "pad": None, "used": set() if want_used else None}
+    depth = 0
+    root = None
+    for event, elem in iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                if elem.tag != "NPCCharacters":
+                    raise ValueError(f"root element is <{elem.tag}>, expected <NPCCharacters>")
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+        if elem.tag == "NPCCharacter":
+            index["count"] += 1
+            m = RE_STUB_INDEX.fullmatch(elem.get("id", ""))
+            if m:
+                digits = m.group(1)
+                n = int(digits)
+                index["max"] = n if index["max"] is None else max(index["max"], n)
+                index["pad"] = len(digits) if index["pad"] is None else min(index["pad"], len(digits))
+                if want_used:
+                    index["used"].add(n)
+        root.clear()  # drop parsed stubs: memory stays flat
+    return index
+
+def free_indices(start: int, count: int, used: set | None):
+    """Yield count indices from start, skipping those in used."""
+    i = start
+    while count > 0:
+        if not used or i not in used:
+            yield i
+            count -= 1
+        i += 1
+
+def append_stubs(path: Path, indices, pad: int, render, batch: int = 4096) -> int:
+    """
+    Insert stubs before the closing </NPCCharacters> of path (or expand an empty
+    <NPCCharacters />) without rewriting what precedes it: only the root's end tag
+    and whatever follows it are rewritten. New lines use the file's newline style.
+    On failure the file is restored to its original content.
+    Returns the number of stubs appended.
+    """
+    with open(path, "r+b") as f:
+        # Find the end of the root element, scanning back from the end of the file
+        size = f.seek(0, os.SEEK_END)
+        pos, tail, match = size, b"", None
+        while match is None and pos > 0:
+            step = min(pos, 1 << 16)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            matches = list(RE_ROOT_END.finditer(tail))
+            match = matches[-1] if matches else None
+        if match is None:
+            raise ValueError("no </NPCCharacters> end tag found")
+
+        end_offset = pos + match.start()
+        after = tail[match.end():]
+        before = tail[:match.start()]
+        nl = b"\r\n" if b"\r\n" in tail else b"\n"
+        self_closing = match.group().endswith(b"/>")
+
+        if self_closing:
+            head = b"<NPCCharacters>" + nl
+        else:
+            head = b"" if before.endswith(b"\n") else nl
+
+        def encode(text: str) -> bytes:
+            return text.replace("\n", nl.decode()).encode("utf-8", errors="xmlcharrefreplace")
+
+        count = 0
+        try:
+            f.seek(end_offset)
+            f.write(head)
+            chunk = []
+            for i in indices:
+                chunk.append(f"  {render(f'{ID_PREFIX}{str(i).zfill(pad)}')}\n")
+                if len(chunk) >= batch:
+                    f.write(encode("".join(chunk)))
+                    count += len(chunk)
+                    chunk.clear()
+            if chunk:
+                f.write(encode("".join(chunk)))
+                count += len(chunk)
+            f.write(b"</NPCCharacters>" + after)
+            f.truncate()
+        except BaseException:
+            f.seek(end_offset)
+            f.write(match.group() + after)
+            f.truncate()
+            raise
+    return count
 
 def main(argv=None):
     p = argparse.ArgumentParser(description="Generate minimal NPCCharacter stubs (Retinues).")
-    p.add_argument("-n", "--count", type=int, required=True, help="Number of stubs to generate.")
-    p.add_argument("--start", type=int, default=0, help="Starting index for numbering (default: 0).")
+    p.add_argument("-n", "--count", type=int, help="Number of stubs to generate.")
+    p.add_argument("--start", type=int, default=None, help="Starting index for numbering (default: 0, or after the highest existing id with --append-to).")
     p.add_argument("-o", "--output", default="stubs.xml", help="Output XML file path (default: stubs.xml).")
     p.add_argument("--culture", default="Culture.empire", help="Culture string (default: Culture.empire).")
     p.add_argument("--group", default="Infantry", help="Default battle group (default: Infantry).")
     p.add_argument("--level", type=int, default=1, help="Level (default: 1).")
     p.add_argument("--no-face", action="store_true", help="Do not include a face template.")
     p.add_argument("--face-template", default=None, help="Explicit face_key_template value (overrides defaults).")
+    p.add_argument("--manifest", type=Path, help="Generate every pool described in this JSON manifest (see above).")
+    p.add_argument("-j", "--jobs", type=int, default=0, help="Processes used with --manifest (0 = one per CPU, default: 0).")
+    p.add_argument("--append-to", type=Path, help="Append the stubs to this existing file, with new non-colliding ids and its id padding.")
 
     args = p.parse_args(argv)
 
-    # Determine zero-padding width from the largest index
-    max_index = args.start + args.count - 1
-    pad = max(4, int(math.log10(max(1, max_index))) + 1)  # at least 4 digits for nice sorting
+    if args.manifest:
+        if args.count is not None or args.append_to:
+            p.error("--manifest cannot be combined with -n/--count or --append-to")
+        try:
+            manifest = load_manifest(args.manifest)
+        except ValueError as e:
+            p.error(f"--manifest: {e}")
+        pad = allocate_ids(manifest)
+        written = generate_manifest(manifest, pad, jobs=args.jobs)
+        for pool in manifest["pools"]:
+            first, last = pool["start"], pool["start"] + pool["count"] - 1
+            ids = f"{ID_PREFIX}{str(first).zfill(pad)}..{str(last).zfill(pad)}" if pool["count"] else "(empty)"
+            print(f"  {pool['name']}: {pool['count']} x {pool['culture']} {pool['group']} L{pool['level']} -> {ids}")
+        for output, count in written.items():
+            print(f"Wrote {count} stubs to {output}")
+        return 0
 
-    # Pick face template (unless --no-face)
-    if args.no_face:
-        face_template = None
-    elif args.face_template:
-        face_template = args.face_template
-    else:
-        face_template = DEFAULT_FACE_BY_CULTURE.get(args.culture, DEFAULT_FACE_BY_CULTURE["_default"])
-
-    root = ET.Element("NPCCharacters")
-
-    for i in range(args.start, args.start + args.count):
-        num = str(i).zfill(pad)
-        npc_id = f"retinues_custom_{num}"
-        npc = build_npc_character(
-            npc_id=npc_id,
-            culture=args.culture,
-            default_group=args.group,
-            level=args.level,
-            face_key_template=face_template,
-        )
-        root.append(npc)
+    if args.count is None:
+        p.error("one of -n/--count or --manifest is required")
 
-    tree = ET.ElementTree(root)
+    face_template = pick_face_template(args.culture, args.no_face, args.face_template)
+    render = stub_renderer(
+        culture=args.culture,
+        default_group=args.group,
+        level=args.level,
+        face_key_template=face_template,
+    )
 
-    # Pretty print (ElementTree doesn't indent by default in 3.8/3.9)
-    try:
-        ET.indent(tree, space="  ", level=0)  # Python 3.9+
-    except AttributeError:
-        # Fallback: manual pretty printer
-        def _indent(elem, level=0):
-            i = "\n" + level * "  "
-            if len(elem):
-                if not elem.text or not elem.text.strip():
-                    elem.text = i + "  "
-                for e in elem:
-                    _indent(e, level + 1)
-                if not e.tail or not e.tail.strip():
-                    e.tail = i
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
-        _indent(root)
-
-    tree.write(args.output, encoding="utf-8", xml_declaration=True)
+    if args.append_to:
+        # Without --start new ids follow the highest existing one, so only that is
+        # needed; an explicit --start must skip every index already taken
+        try:
+            index = index_stub_ids(args.append_to, want_used=args.start is not None)
+        except (OSError, ValueError, SyntaxError) as e:
+            p.error(f"--append-to: cannot index {args.append_to}: {e}")
+        if args.start is not None:
+            start = args.start
+        else:
+            start = 0 if index["max"] is None else index["max"] + 1
+        indices = list(free_indices(start, args.count, index["used"]))
+        pad = index["pad"] or id_padding(indices[-1] if indices else start)
+        try:
+            count = append_stubs(args.append_to, indices, pad, render)
+        except ValueError as e:
+            p.error(f"--append-to: {e}")
+        span = f" ({ID_PREFIX}{str(indices[0]).zfill(pad)}..{str(indices[-1]).zfill(pad)})" if indices else ""
+        print(f"Appended {count} stubs to {args.append_to}{span}, {index['count'] + count} in total")
+        return 0
+
+    start = args.start or 0
+    pad = id_padding(start + args.count - 1)
+    write_stubs(args.output, stub_ids(start, args.count, pad), render)
     print(f"Wrote {args.count} stubs to {args.output}")
 
 